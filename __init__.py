@@ -1,5 +1,4 @@
 from terminal import Terminal
 from application import Application
-from events import ResizedEvent, KeyEvent, MouseEvent
-
-
+from aio import AsyncTerminal, AsyncApplication
+from events import ResizedEvent, OutputDrainedEvent, KeyEvent, MouseEvent, PasteEvent
@@ -0,0 +1,267 @@
+#
+# a terminal and an application driven by an asyncio event loop (or trollius, its
+# python 2 backport), so network clients, subprocesses and timers can run alongside
+# the UI. the tty is registered with loop.add_reader (and add_writer, while
+# non-blocking output is queued), and events are handed out as futures; the widget
+# tree is the same as under the blocking Application. with trollius, a coroutine
+# waits for events with
+#
+#   @asyncio.coroutine
+#   def handle_events(term):
+#       while True:
+#           evt = yield asyncio.From(term.get_event())
+#
+import sys
+import signal
+try:
+    import asyncio
+except ImportError:
+    try:
+        import trollius as asyncio
+    except ImportError:
+        asyncio = None
+from .terminal import Terminal
+from .application import Application
+from .events import terminal_keys_decoder
+
+
+class AsyncTerminal(Terminal):
+    def __init__(self, fd = sys.stdout, loop = None, char_completion_timeout = 0.05, **kwargs):
+        if asyncio is None:
+            raise ImportError("AsyncTerminal requires asyncio (or trollius)")
+        Terminal.__init__(self, fd, **kwargs)
+        self.loop = loop or asyncio.get_event_loop()
+        self.char_completion_timeout = char_completion_timeout
+        self._waiters = []
+        self._completion_handle = None
+        self._registered = False
+        self._writer_registered = False
+        self._eof = False
+
+    def setup(self):
+        Terminal.setup(self)
+        self._registered = True
+        self._flush_output()
+
+    def restore(self):
+        if self._completion_handle is not None:
+            self._completion_handle.cancel()
+            self._completion_handle = None
+        for waiter in self._waiters:
+            waiter.cancel()
+        del self._waiters[:]
+        Terminal.restore(self)
+
+    def _install_handlers(self):
+        # the loop watches the tty and handles SIGWINCH itself (a plain signal handler
+        # wouldn't wake it up), and threads wake it up with call_soon_threadsafe, so
+        # there's no wakeup pipe
+        self.loop.add_reader(self.fd, self._on_readable)
+        self.loop.add_signal_handler(signal.SIGWINCH, self._on_sigwinch)
+
+    def _remove_handlers(self):
+        self._registered = False
+        self.loop.remove_signal_handler(signal.SIGWINCH)
+        self.loop.remove_reader(self.fd)
+        if self._writer_registered:
+            self.loop.remove_writer(self.fd)
+            self._writer_registered = False
+
+    #=========================================================================
+    # Loop callbacks
+    #=========================================================================
+    def _on_sigwinch(self):
+        self._sigwinch()
+        self._dispatch()
+
+    def _on_readable(self):
+        try:
+            data = self._read_all()
+        except EOFError:
+            self.loop.remove_reader(self.fd)
+            self._eof = True
+            self._dispatch()
+            return
+        output = self._decoder.decode(data)
+        if output:
+            self._events.extend(terminal_keys_decoder.decode(output))
+        if self._completion_handle is not None:
+            self._completion_handle.cancel()
+            self._completion_handle = None
+        if terminal_keys_decoder.pending:
+            # an incomplete sequence (or a lone escape); it's taken as is unless the
+            # rest of it arrives in time
+            self._completion_handle = self.loop.call_later(self.char_completion_timeout,
+                self._on_completion_timeout)
+        self._dispatch()
+
+    def _on_completion_timeout(self):
+        self._completion_handle = None
+        evt = terminal_keys_decoder.pull()
+        if evt:
+            self._events.append(evt)
+        self._dispatch()
+
+    def _on_writable(self):
+        self._flush_output()
+        self._dispatch()
+
+    def _flush_output(self):
+        Terminal._flush_output(self)
+        if not self._registered:
+            return
+        if self._output_queue and not self._writer_registered:
+            self.loop.add_writer(self.fd, self._on_writable)
+            self._writer_registered = True
+        elif not self._output_queue and self._writer_registered:
+            self.loop.remove_writer(self.fd)
+            self._writer_registered = False
+
+    def _dispatch(self):
+        while self._waiters and (self._events or self._eof):
+            waiter = self._waiters.pop(0)
+            if waiter.done():
+                continue
+            if self._events:
+                waiter.set_result(self._events.pop(0))
+            else:
+                waiter.set_exception(EOFError())
+
+    #=========================================================================
+    # APIs
+    #=========================================================================
+    def get_event(self):
+        """Returns a future of the next event, which coroutines wait on with 
+        ``yield From(term.get_event())``"""
+        waiter = asyncio.Future(loop = self.loop)
+        self._waiters.append(waiter)
+        self._dispatch()
+        return waiter
+
+    def pop_event(self):
+        """Returns the next event that's already been received, or None"""
+        if self._waiters or not self._events:
+            return None
+        return self._events.pop(0)
+
+
+class AsyncApplication(Application):
+    def __init__(self, root, loop = None, **kwargs):
+        Application.__init__(self, root, **kwargs)
+        self.loop = loop
+        self._done = None
+        self._redraw_handle = None
+        self._wakeup_handle = None
+
+    def main(self):
+        loop = self.loop or asyncio.get_event_loop()
+        loop.run_until_complete(self.start(loop))
+        return 0
+
+    def start(self, loop = None):
+        """Sets up the terminal and starts handling events on the loop; returns a
+        future that's done when the application quits"""
+        if asyncio is None:
+            raise ImportError("AsyncApplication requires asyncio (or trollius)")
+        self.loop = loop or self.loop or asyncio.get_event_loop()
+        self.term = AsyncTerminal(loop = self.loop, **self._get_terminal_options())
+        self.term.setup()
+        self._done = asyncio.Future(loop = self.loop)
+        self.term.get_event().add_done_callback(self._on_event)
+        self._timers_changed()
+        if self._posted:
+            self.loop.call_soon(self._on_posted)
+        return self._done
+
+    def quit(self, exc = None):
+        if self._done is None or self._done.done():
+            return
+        if self._redraw_handle is not None:
+            self._redraw_handle.cancel()
+            self._redraw_handle = None
+        if self._wakeup_handle is not None:
+            self._wakeup_handle.cancel()
+            self._wakeup_handle = None
+        try:
+            self.term.clear_screen()
+        finally:
+            self.term.restore()
+        if exc is None:
+            self._done.set_result(None)
+        else:
+            self._done.set_exception(exc)
+
+    def request_redraw(self):
+        # redraws are coalesced into one per iteration of the loop
+        self.redraw_pending = True
+        if self._redraw_handle is None and self._done is not None and not self._done.done():
+            self._redraw_handle = self.loop.call_soon(self._on_redraw)
+
+    def _on_redraw(self):
+        self._redraw_handle = None
+        if not self.redraw_pending or self.root_canvas is None:
+            return
+        try:
+            self._redraw()
+        except Exception, ex:
+            self.quit(ex)
+
+    def _wakeup(self):
+        if self._done is not None and not self._done.done():
+            self.loop.call_soon_threadsafe(self._on_posted)
+
+    def _on_posted(self):
+        try:
+            self._run_posted()
+        except Exception, ex:
+            self.quit(ex)
+            return
+        if self.redraw_pending:
+            self.request_redraw()
+
+    def _timers_changed(self):
+        # the loop is woken up for the earliest timer (or right away, for idle 
+        # callbacks)
+        if self._done is None or self._done.done():
+            return
+        if self._wakeup_handle is not None:
+            self._wakeup_handle.cancel()
+        timeout = self._get_timeout()
+        if timeout is None:
+            self._wakeup_handle = None
+        else:
+            self._wakeup_handle = self.loop.call_later(timeout, self._on_wakeup)
+
+    def _on_wakeup(self):
+        self._wakeup_handle = None
+        try:
+            self._run_timers()
+            self._run_idle_callbacks()
+        except Exception, ex:
+            self.quit(ex)
+            return
+        if self.redraw_pending:
+            self.request_redraw()
+        self._timers_changed()
+
+    def _on_event(self, fut):
+        if fut.cancelled():
+            return
+        try:
+            evt = fut.result()
+            while evt is not None:
+                if not self._process_event(evt):
+                    self.quit()
+                    return
+                evt = self.term.pop_event()
+        except EOFError:
+            self.quit()
+            return
+        except Exception, ex:
+            self.quit(ex)
+            return
+        if self.redraw_pending:
+            self.request_redraw()
+        self.term.get_event().add_done_callback(self._on_event)
+
+
@@ -1,41 +1,183 @@
+import time
+import heapq
+import threading
+from collections import deque
 from .terminal import Terminal
-from .events import ResizedEvent, KeyEvent
+from .events import ResizedEvent, OutputDrainedEvent, KeyEvent
 from .styles import default_style
 from .cliapp import CliApplication
 
 
+class Timer(object):
+    __slots__ = ["deadline", "interval", "func", "args", "cancelled"]
+    def __init__(self, deadline, interval, func, args):
+        self.deadline = deadline
+        self.interval = interval
+        self.func = func
+        self.args = args
+        self.cancelled = False
+    def __repr__(self):
+        return "Timer(%r, every = %r)" % (self.func, self.interval)
+    def cancel(self):
+        self.cancelled = True
+
+
 class Application(CliApplication):
-    def __init__(self, root, style = default_style, capture_mouse = False, exec_in_tty = True, force_quit_key = "ctrl c"):
+    def __init__(self, root, style = default_style, capture_mouse = False, exec_in_tty = True, force_quit_key = "ctrl c",
+            sync_output = False, nonblocking_output = False, bracketed_paste = True, 
+            numpy_canvas = False):
         CliApplication.__init__(self)
         self.root = root
         self.style = style
         self.exec_in_tty = exec_in_tty
         self.capture_mouse = capture_mouse
+        self.sync_output = sync_output
+        self.nonblocking_output = nonblocking_output
+        self.bracketed_paste = bracketed_paste
+        self.numpy_canvas = numpy_canvas
         self.force_quit_key = KeyEvent.from_string(force_quit_key)
+        self.term = None
+        self.root_canvas = None
+        self.redraw_pending = False
+        # a heap of (deadline, seq, timer); cancelled timers are dropped when they 
+        # come up
+        self._timers = []
+        self._timer_seq = 0
+        self._idle_callbacks = []
+        # callables posted from other threads
+        self._posted = deque()
+        self._posted_lock = threading.Lock()
 
     def main(self):
         self._mainloop()
         return 0
 
+    def _get_terminal_options(self):
+        return dict(use_mouse = self.capture_mouse, exec_in_tty = self.exec_in_tty, 
+            use_sync_output = self.sync_output, nonblocking_output = self.nonblocking_output,
+            bracketed_paste = self.bracketed_paste, use_numpy_canvas = self.numpy_canvas)
+
+    def request_redraw(self):
+        self.redraw_pending = True
+
+    #=========================================================================
+    # Scheduling
+    #=========================================================================
+    # like event handlers, callbacks return True when the screen has to be redrawn
+    def call_later(self, delay, func, *args):
+        return self._add_timer(Timer(time.time() + delay, None, func, args))
+
+    def call_every(self, interval, func, *args):
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+        return self._add_timer(Timer(time.time() + interval, interval, func, args))
+
+    def call_when_idle(self, func, *args):
+        """Calls func once no more input is pending"""
+        self._idle_callbacks.append((func, args))
+        self._timers_changed()
+
+    def call_soon_threadsafe(self, func, *args):
+        """Calls func on the UI thread; this can be called from any thread. Whatever
+        was posted by the time the loop wakes up is run as a batch, followed by a 
+        single redraw"""
+        with self._posted_lock:
+            wake = not self._posted
+            self._posted.append((func, args))
+        if wake:
+            self._wakeup()
+
+    def _wakeup(self):
+        term = self.term
+        if term is not None:
+            term.wakeup()
+
+    def _add_timer(self, timer):
+        self._timer_seq += 1
+        heapq.heappush(self._timers, (timer.deadline, self._timer_seq, timer))
+        self._timers_changed()
+        return timer
+
+    def _timers_changed(self):
+        pass
+
+    def _get_timeout(self):
+        # how long the loop may sleep waiting for input; None is forever
+        if self._idle_callbacks:
+            return 0
+        timers = self._timers
+        while timers and timers[0][2].cancelled:
+            heapq.heappop(timers)
+        if not timers:
+            return None
+        return max(timers[0][0] - time.time(), 0)
+
+    def _run_timers(self):
+        now = time.time()
+        timers = self._timers
+        while timers and timers[0][0] <= now:
+            _, _, timer = heapq.heappop(timers)
+            if timer.cancelled:
+                continue
+            if timer.interval is not None:
+                # a timer that fell behind skips the missed ticks, instead of firing
+                # them all at once
+                timer.deadline += timer.interval
+                if timer.deadline <= now:
+                    timer.deadline = now + timer.interval
+                self._timer_seq += 1
+                heapq.heappush(timers, (timer.deadline, self._timer_seq, timer))
+            if timer.func(*timer.args):
+                self.redraw_pending = True
+
+    def _run_posted(self):
+        with self._posted_lock:
+            callbacks = list(self._posted)
+            self._posted.clear()
+        for func, args in callbacks:
+            if func(*args):
+                self.redraw_pending = True
+
+    def _run_idle_callbacks(self):
+        callbacks = self._idle_callbacks
+        self._idle_callbacks = []
+        for func, args in callbacks:
+            if func(*args):
+                self.redraw_pending = True
+
+    def _process_event(self, evt):
+        # returns False when the application should quit
+        if evt == ResizedEvent:
+            self.root_canvas = self.term.get_root_canvas()
+            self.root.remodel(self.root_canvas)
+            self.term.clear_screen()
+            self.redraw_pending = True
+        elif evt == OutputDrainedEvent:
+            self.root_canvas.commit_held()
+        elif evt == self.force_quit_key:
+            return False
+        elif self.root.on_event(evt):
+            self.redraw_pending = True
+        return True
+
+    def _redraw(self):
+        self.redraw_pending = False
+        self.root.render(self.style, focused = True)
+        self.root_canvas.commit()
+
     def _mainloop(self):
-        with Terminal(use_mouse = self.capture_mouse, exec_in_tty = self.exec_in_tty) as term:
-            redraw = True
+        with Terminal(**self._get_terminal_options()) as term:
+            self.term = term
             while True:
-                evt = term.get_event()
-                if evt == ResizedEvent:
-                    root_canvas = term.get_root_canvas()
-                    self.root.remodel(root_canvas)
-                    term.clear_screen()
-                    redraw = True
-                elif evt == self.force_quit_key:
+                evt = term.get_event(self._get_timeout())
+                if evt is None:
+                    self._run_idle_callbacks()
+                elif not self._process_event(evt):
                     break
-                elif self.root.on_event(evt):
-                    redraw = True
-                
-                if redraw:
-                    self.root.render(self.style, focused = True)
-                    root_canvas.commit()
-                    redraw = False
+                self._run_posted()
+                self._run_timers()
+                if self.redraw_pending:
+                    self._redraw()
             
             term.clear_screen()
 
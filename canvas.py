@@ -1,5 +1,13 @@
+from array import array
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
 class Canvas(object):
-    __slots__ = ["parent", "offx", "offy", "width", "height"]
+    __slots__ = ["parent", "offx", "offy", "width", "height", "root", "absx", "absy", 
+        "clip_left", "clip_top", "clip_right", "clip_bottom"]
     
     LEFT_ARROW = u"\u00ab"
     RIGHT_ARROW = u"\u00bb"
@@ -27,27 +35,76 @@ class Canvas(object):
             width = max(width, 0)
         self.width = width
         if height is not None:
-            width = max(width, 0)
+            height = max(height, 0)
         self.height = height
+        # the absolute offsets and clip rectangle are precomputed, so writes go 
+        # straight to the root, regardless of how deeply canvases are nested
+        self.root = parent.root
+        self.absx = parent.absx + offx
+        self.absy = parent.absy + offy
+        self.clip_left = max(parent.clip_left, self.absx)
+        self.clip_top = max(parent.clip_top, self.absy)
+        if width is None:
+            self.clip_right = parent.clip_right
+        else:
+            self.clip_right = min(parent.clip_right, self.absx + width)
+        if height is None:
+            self.clip_bottom = parent.clip_bottom
+        else:
+            self.clip_bottom = min(parent.clip_bottom, self.absy + height)
     
     def get_dims(self):
         return self.offx, self.offy, self.width, self.height
     
     def write(self, x, y, text, **attrs):
-        if y < 0 or y >= self.height and self.height is not None:
+        y += self.absy
+        if y < self.clip_top or y >= self.clip_bottom:
             return
-        if x < 0:
-            text = text[-x:]
-            x = 0
-        if self.width is not None:
-            text = text[:self.width - x]
+        x += self.absx
+        if x < self.clip_left:
+            text = text[self.clip_left - x:]
+            x = self.clip_left
+        if x >= self.clip_right:
+            return
+        text = text[:self.clip_right - x]
         if text:
-            self.parent.write(self.offx + x, self.offy + y, text, **attrs)
+            self.root._write(x, y, text, attr_table.intern(attrs))
 
     def subcanvas(self, offx = 0, offy = 0, width = -1, height = -1):
         width = max(self.width - offx if width == -1 else width, 0)
         height = max(self.height - offy if height == -1 else height, 0)
         return Canvas(self, offx, offy, width, height)
+    
+    def scrolled_subcanvas(self, virtual_width, virtual_height, offx = 0, offy = 0, 
+            width = -1, height = -1):
+        width = max(self.width - offx if width == -1 else width, 0)
+        height = max(self.height - offy if height == -1 else height, 0)
+        return ScrolledCanvas(self, offx, offy, width, height, virtual_width, virtual_height)
+    
+    def blit(self, x, y, grid, srcx, srcy, width, height):
+        # copies the width x height block of grid at (srcx, srcy) to (x, y)
+        x += self.absx
+        y += self.absy
+        if srcx < 0:
+            x -= srcx
+            width += srcx
+            srcx = 0
+        if srcy < 0:
+            y -= srcy
+            height += srcy
+            srcy = 0
+        if x < self.clip_left:
+            srcx += self.clip_left - x
+            width -= self.clip_left - x
+            x = self.clip_left
+        if y < self.clip_top:
+            srcy += self.clip_top - y
+            height -= self.clip_top - y
+            y = self.clip_top
+        width = min(width, self.clip_right - x, grid.width - srcx)
+        height = min(height, self.clip_bottom - y, grid.height - srcy)
+        if width > 0 and height > 0:
+            self.root._blit(x, y, grid, srcx, srcy, width, height)
 
     #=========================================================================
     # box drawing
@@ -77,49 +134,491 @@ class Canvas(object):
         self.write(0, y, " " * self.width, **attrs)
 
 
+class AttrTable(object):
+    # maps each (fg, bg, bold, underlined, inversed, dim, blink) combination to a small
+    # integer, so cells store ints and the diff and the terminal compare ints
+    FIELDS = ("fg", "bg", "bold", "underlined", "inversed", "dim", "blink")
+    __slots__ = ["_ids", "_key_ids", "_attrs"]
+    
+    def __init__(self):
+        self._ids = {}
+        self._key_ids = {}
+        self._attrs = []
+        self.intern({})
+    
+    def intern(self, attrs):
+        # the kwargs passed to write() repeat a lot, so they are cached as given
+        # before being normalized (e.g., bold = False is the same as no bold)
+        raw_key = frozenset(attrs.iteritems())
+        try:
+            return self._ids[raw_key]
+        except KeyError:
+            pass
+        key = (attrs.get("fg"), attrs.get("bg"), bool(attrs.get("bold")), 
+            bool(attrs.get("underlined")), bool(attrs.get("inversed")), 
+            bool(attrs.get("dim")), bool(attrs.get("blink")))
+        aid = self._key_ids.get(key)
+        if aid is None:
+            aid = self._key_ids[key] = len(self._attrs)
+            self._attrs.append(dict(zip(self.FIELDS, key)))
+        self._ids[raw_key] = aid
+        return aid
+    
+    def __getitem__(self, aid):
+        return self._attrs[aid]
+    def __len__(self):
+        return len(self._attrs)
+
+attr_table = AttrTable()
+
+
+class CellGrid(object):
+    # two parallel row-major planes: the characters and their interned attribute ids.
+    # damage_lo/damage_hi hold the span of each row written since the last clear
+    __slots__ = ["width", "height", "chars", "attrs", "damage_lo", "damage_hi"]
+    
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.chars = array("u", RootCanvas.EMPTY_CHAR) * (width * height)
+        self.attrs = array("H", [RootCanvas.EMPTY_ATTR]) * (width * height)
+        self.damage_lo = array("i", [width]) * height
+        self.damage_hi = array("i", [0]) * height
+    
+    def clear(self, blank):
+        # only the damaged spans can differ from the blank grid
+        width = self.width
+        lo, hi = self.damage_lo, self.damage_hi
+        for y in xrange(self.height):
+            if lo[y] < hi[y]:
+                start = y * width + lo[y]
+                end = y * width + hi[y]
+                self.chars[start:end] = blank.chars[start:end]
+                self.attrs[start:end] = blank.attrs[start:end]
+        lo[:] = blank.damage_lo
+        hi[:] = blank.damage_hi
+    
+    def put(self, x, y, text, aid):
+        start = y * self.width + x
+        end = start + len(text)
+        self.chars[start:end] = array("u", unicode(text))
+        self.attrs[start:end] = array("H", [aid]) * len(text)
+        if x < self.damage_lo[y]:
+            self.damage_lo[y] = x
+        if x + len(text) > self.damage_hi[y]:
+            self.damage_hi[y] = x + len(text)
+    
+    def blit(self, x, y, src, srcx, srcy, width, height):
+        # src is a CellGrid; cells outside of its damaged spans are blank, so the damage
+        # of this grid only grows by the damaged part of each copied row
+        for i in xrange(height):
+            sy = srcy + i
+            start = (y + i) * self.width + x
+            sstart = sy * src.width + srcx
+            self.chars[start:start+width] = src.chars[sstart:sstart+width]
+            self.attrs[start:start+width] = src.attrs[sstart:sstart+width]
+            lo = max(src.damage_lo[sy], srcx) - srcx + x
+            hi = min(src.damage_hi[sy], srcx + width) - srcx + x
+            if lo < hi:
+                if lo < self.damage_lo[y + i]:
+                    self.damage_lo[y + i] = lo
+                if hi > self.damage_hi[y + i]:
+                    self.damage_hi[y + i] = hi
+    
+    def row_key(self, y, x0, x1):
+        start = y * self.width
+        return self.chars[start+x0:start+x1].tostring() + self.attrs[start+x0:start+x1].tostring()
+    
+    def diff_span(self, other, y, lo, hi, other_y = None):
+        # returns the (first, last + 1) columns of row y, between lo and hi, that differ 
+        # from other's row (by default, the same row); the longest equal prefix and 
+        # suffix are found by bisection
+        row = y * self.width
+        delta = (y if other_y is None else other_y) * self.width - row
+        a, b, c, d = self.chars, other.chars, self.attrs, other.attrs
+        def same(start, end):
+            return a[start:end] == b[start+delta:end+delta] and \
+                c[start:end] == d[start+delta:end+delta]
+        if same(row + lo, row + hi):
+            return None
+        good, bad = 0, hi - lo
+        while bad - good > 1:
+            mid = (good + bad) // 2
+            if same(row + lo, row + lo + mid):
+                good = mid
+            else:
+                bad = mid
+        first = lo + good
+        good, bad = 0, hi - first
+        while bad - good > 1:
+            mid = (good + bad) // 2
+            if same(row + hi - mid, row + hi):
+                good = mid
+            else:
+                bad = mid
+        return first, hi - good
+    
+    def shift_rows(self, top, bottom, count):
+        # mirrors Terminal.scroll: rows top..bottom move up by count (down if negative)
+        # and the exposed rows are blanked
+        width = self.width
+        n = abs(count)
+        if count > 0:
+            dst, src, exposed = top, top + n, bottom - n + 1
+        else:
+            dst, src, exposed = top + n, top, top
+        rows = bottom - top + 1 - n
+        self.chars[dst*width:(dst+rows)*width] = self.chars[src*width:(src+rows)*width]
+        self.attrs[dst*width:(dst+rows)*width] = self.attrs[src*width:(src+rows)*width]
+        self.damage_lo[dst:dst+rows] = self.damage_lo[src:src+rows]
+        self.damage_hi[dst:dst+rows] = self.damage_hi[src:src+rows]
+        self.chars[exposed*width:(exposed+n)*width] = array("u", RootCanvas.EMPTY_CHAR) * (n * width)
+        self.attrs[exposed*width:(exposed+n)*width] = array("H", [RootCanvas.EMPTY_ATTR]) * (n * width)
+        self.damage_lo[exposed:exposed+n] = array("i", [width]) * n
+        self.damage_hi[exposed:exposed+n] = array("i", [0]) * n
+
+
 class RootCanvas(Canvas):
-    EMPTY_CHAR = (" ", {})
-    def __init__(self, term, width, height):
+    EMPTY_CHAR = u" "
+    EMPTY_ATTR = 0
+    
+    SCROLL_MIN_ROWS = 3
+    
+    def __init__(self, term, width, height, double_buffered = True, use_scrolling = True):
         self.term = term
+        self.parent = None
+        self.offx = self.offy = 0
         self.width = width
         self.height = height
+        self.root = self
+        self.absx = self.absy = 0
+        self.clip_left = self.clip_top = 0
+        self.clip_right = width
+        self.clip_bottom = height
+        self.double_buffered = double_buffered
+        self.use_scrolling = use_scrolling
+        self.attr_table = attr_table
         self.new_buffer = self._get_empty_buffer()
         self.old_buffer = self._get_empty_buffer()
+        self._blank_buffer = self._get_empty_buffer() if double_buffered else None
+        self.held_buffer = None
 
     def get_dims(self):
         return 0, 0, self.width, self.height
     
     def _get_empty_buffer(self):
-        return [[self.EMPTY_CHAR] * self.width for i in range(self.height)]
+        return CellGrid(self.width, self.height)
     
     def commit(self):
-        for y in range(self.height):
-            for x in range(self.width):
-                new = self.new_buffer[y][x]
-                old = self.old_buffer[y][x]
-                if new != old:
-                    ch, attrs = new
-                    self.term.write(x, y, ch, attrs)
+        if self.term.is_backlogged():
+            # the terminal is behind: the frame is held back (replacing any frame held
+            # back before), to be diffed against what was sent once the output drains
+            held, self.held_buffer = self.held_buffer, self.new_buffer
+            if held is not None and self.double_buffered:
+                self._clear_buffer(held)
+            else:
+                held = self._get_empty_buffer()
+            self.new_buffer = held
+            return False
+        self.held_buffer = None
+        new, old = self.new_buffer, self.old_buffer
+        if self.use_scrolling and self.term.can_scroll:
+            self._scroll(new, old)
+        self._commit_diff(new, old)
         self.term.commit()
-        self.old_buffer = self.new_buffer
-        self.new_buffer = self._get_empty_buffer()
+        if self.double_buffered:
+            self.old_buffer, self.new_buffer = new, old
+            self._clear_buffer(self.new_buffer)
+        else:
+            self.old_buffer = new
+            self.new_buffer = self._get_empty_buffer()
+        return True
     
-    def write(self, x, y, text, **attrs):
-        if y < 0 or y >= self.height:
+    def commit_held(self):
+        # commits the frame held back while the terminal was behind, if any
+        if self.held_buffer is None:
+            return False
+        self.new_buffer, self.held_buffer = self.held_buffer, None
+        return self.commit()
+    
+    def _clear_buffer(self, buf):
+        buf.clear(self._blank_buffer)
+    
+    def _scroll(self, new, old):
+        # detects a block of rows that moved up or down (e.g., a scrolled list), scrolls
+        # it on the terminal and shifts the old buffer to match, so the diff only has to
+        # draw the exposed lines
+        width = self.width
+        changed = []
+        x0, x1 = width, 0
+        for y in xrange(self.height):
+            lo = min(new.damage_lo[y], old.damage_lo[y])
+            hi = max(new.damage_hi[y], old.damage_hi[y])
+            if lo >= hi:
+                continue
+            span = new.diff_span(old, y, lo, hi)
+            if span:
+                changed.append(y)
+                x0 = min(x0, span[0])
+                x1 = max(x1, span[1])
+        if len(changed) < self.SCROLL_MIN_ROWS:
             return
-        for ch in text:
-            if x < 0:
-                x += 1
+        
+        # rows are compared on the columns that changed; each changed row votes for the
+        # shift that would bring it from the old buffer, if its content is unique there
+        top, bottom = changed[0], changed[-1]
+        old_rows = {}
+        for y in xrange(top, bottom + 1):
+            old_rows.setdefault(old.row_key(y, x0, x1), []).append(y)
+        new_keys = {}
+        votes = {}
+        for y in changed:
+            key = new_keys[y] = new.row_key(y, x0, x1)
+            ys = old_rows.get(key, ())
+            if len(ys) == 1 and ys[0] != y:
+                shift = ys[0] - y
+                votes[shift] = votes.get(shift, 0) + 1
+        if not votes:
+            return
+        shift = max(votes, key = votes.get)
+        matched = [y for y in changed if 0 <= y + shift < self.height and 
+            new_keys[y] == old.row_key(y + shift, x0, x1)]
+        if len(matched) < self.SCROLL_MIN_ROWS:
+            return
+        if shift > 0:
+            top, bottom = matched[0], matched[-1] + shift
+        else:
+            top, bottom = matched[0] + shift, matched[-1]
+        
+        # scrolling moves whole rows: unchanged rows of the block and the columns 
+        # around the compared ones may have to be redrawn afterwards
+        saved = len(matched) * (x1 - x0)
+        cost = 0
+        for y in xrange(top, bottom + 1):
+            src = y + shift
+            if not (top <= src <= bottom):
                 continue
-            if x >= self.width:
-                break
-            self.new_buffer[y][x] = (ch, attrs)
-            x += 1
+            if y not in new_keys:
+                cost += x1 - x0
+            for lo, hi in ((0, x0), (x1, width)):
+                span = old.diff_span(old, y, lo, hi, src) if lo < hi else None
+                if span:
+                    cost += span[1] - span[0]
+        if saved - cost < width:
+            return
+        if self.term.scroll(top, bottom, shift):
+            old.shift_rows(top, bottom, shift)
+    
+    def _commit_diff(self, new, old):
+        new_chars, new_attrs = new.chars, new.attrs
+        old_chars, old_attrs = old.chars, old.attrs
+        new_lo, new_hi = new.damage_lo, new.damage_hi
+        old_lo, old_hi = old.damage_lo, old.damage_hi
+        write = self.term.write
+        width = self.width
+        for y in xrange(self.height):
+            # cells outside of both frames' damaged spans are blank in both
+            lo = min(new_lo[y], old_lo[y])
+            hi = max(new_hi[y], old_hi[y])
+            if lo >= hi:
+                continue
+            row = y * width
+            start = row + lo
+            end = row + hi
+            if new_chars[start:end] == old_chars[start:end] and \
+                    new_attrs[start:end] == old_attrs[start:end]:
+                continue
+            # coalesce adjacent changed cells sharing the same attributes into runs,
+            # so each run costs a single cursor move and attribute transition
+            i = start
+            while i < end:
+                if new_chars[i] == old_chars[i] and new_attrs[i] == old_attrs[i]:
+                    i += 1
+                    continue
+                aid = new_attrs[i]
+                j = i + 1
+                while j < end and new_attrs[j] == aid and \
+                        (new_chars[j] != old_chars[j] or old_attrs[j] != aid):
+                    j += 1
+                write(i - row, y, new_chars[i:j].tounicode(), aid)
+                i = j
+    
+    def _write(self, x, y, text, aid):
+        # (x, y, text) must already be clipped to the canvas
+        self.new_buffer.put(x, y, text, aid)
+    def _blit(self, x, y, grid, srcx, srcy, width, height):
+        self.new_buffer.blit(x, y, grid, srcx, srcy, width, height)
 
 
-class ScrolledCanvas(object):
-    def __init__(self, parent, offx, offy, width, height):
-        pass
+class NumpyCellGrid(object):
+    # same layout as CellGrid, but the planes are 2D numpy arrays holding codepoints
+    __slots__ = ["width", "height", "chars", "attrs", "damage_lo", "damage_hi"]
+    
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.chars = numpy.empty((height, width), dtype = NumpyRootCanvas.CHAR_DTYPE)
+        self.chars.fill(ord(RootCanvas.EMPTY_CHAR))
+        self.attrs = numpy.empty((height, width), dtype = numpy.uint16)
+        self.attrs.fill(RootCanvas.EMPTY_ATTR)
+        self.damage_lo = numpy.empty(height, dtype = numpy.intp)
+        self.damage_lo.fill(width)
+        self.damage_hi = numpy.zeros(height, dtype = numpy.intp)
+    
+    def clear(self, blank):
+        rows = self.damage_lo < self.damage_hi
+        self.chars[rows] = blank.chars[rows]
+        self.attrs[rows] = blank.attrs[rows]
+        self.damage_lo[:] = blank.damage_lo
+        self.damage_hi[:] = blank.damage_hi
+    
+    def put(self, x, y, text, aid):
+        end = x + len(text)
+        self.chars[y, x:end] = numpy.frombuffer(unicode(text).encode("utf-32-le"), 
+            dtype = NumpyRootCanvas.CHAR_DTYPE)
+        self.attrs[y, x:end] = aid
+        if x < self.damage_lo[y]:
+            self.damage_lo[y] = x
+        if end > self.damage_hi[y]:
+            self.damage_hi[y] = end
+    
+    def blit(self, x, y, src, srcx, srcy, width, height):
+        # src is a (pure-python) CellGrid, as used by ScrolledCanvas
+        for i in xrange(height):
+            sy = srcy + i
+            sstart = sy * src.width + srcx
+            self.chars[y + i, x:x+width] = numpy.frombuffer(
+                src.chars[sstart:sstart+width].tounicode().encode("utf-32-le"), 
+                dtype = NumpyRootCanvas.CHAR_DTYPE)
+            self.attrs[y + i, x:x+width] = numpy.frombuffer(
+                src.attrs[sstart:sstart+width].tostring(), dtype = numpy.uint16)
+            lo = max(src.damage_lo[sy], srcx) - srcx + x
+            hi = min(src.damage_hi[sy], srcx + width) - srcx + x
+            if lo < hi:
+                self.damage_lo[y + i] = min(self.damage_lo[y + i], lo)
+                self.damage_hi[y + i] = max(self.damage_hi[y + i], hi)
+    
+    def row_key(self, y, x0, x1):
+        return self.chars[y, x0:x1].tostring() + self.attrs[y, x0:x1].tostring()
+    
+    def diff_span(self, other, y, lo, hi, other_y = None):
+        if other_y is None:
+            other_y = y
+        diff = numpy.flatnonzero((self.chars[y, lo:hi] != other.chars[other_y, lo:hi]) | 
+            (self.attrs[y, lo:hi] != other.attrs[other_y, lo:hi]))
+        if not diff.size:
+            return None
+        return lo + int(diff[0]), lo + int(diff[-1]) + 1
+    
+    def shift_rows(self, top, bottom, count):
+        n = abs(count)
+        if count > 0:
+            dst, src, exposed = top, top + n, bottom - n + 1
+        else:
+            dst, src, exposed = top + n, top, top
+        rows = bottom - top + 1 - n
+        for plane in (self.chars, self.attrs, self.damage_lo, self.damage_hi):
+            plane[dst:dst+rows] = plane[src:src+rows].copy()
+        self.chars[exposed:exposed+n] = ord(RootCanvas.EMPTY_CHAR)
+        self.attrs[exposed:exposed+n] = RootCanvas.EMPTY_ATTR
+        self.damage_lo[exposed:exposed+n] = self.width
+        self.damage_hi[exposed:exposed+n] = 0
+
+
+class NumpyRootCanvas(RootCanvas):
+    # diffs frames and finds the changed runs with vectorized operations. it only pays
+    # off on large screens with few attribute changes (it's slower than RootCanvas 
+    # when the frame has many short runs; see tests/bench_canvas.py), so it's opt-in
+    CHAR_DTYPE = numpy.dtype("<u4") if numpy else None
+    
+    def _get_empty_buffer(self):
+        return NumpyCellGrid(self.width, self.height)
+    
+    def _commit_diff(self, new, old):
+        rows = numpy.flatnonzero((new.damage_lo < new.damage_hi) | (old.damage_lo < old.damage_hi))
+        if not rows.size:
+            return
+        new_attrs = new.attrs[rows]
+        changed = (new.chars[rows] != old.chars[rows]) | (new_attrs != old.attrs[rows])
+        # a run starts at a changed cell unless the cell to its left is changed and
+        # has the same attributes; it ends likewise with respect to the cell to its right
+        continued = numpy.zeros(changed.shape, dtype = bool)
+        continued[:, 1:] = changed[:, :-1] & changed[:, 1:] & (new_attrs[:, :-1] == new_attrs[:, 1:])
+        starts_y, starts_x = numpy.nonzero(changed & ~continued)
+        continues = numpy.zeros(changed.shape, dtype = bool)
+        continues[:, :-1] = continued[:, 1:]
+        ends_y, ends_x = numpy.nonzero(changed & ~continues)
+        
+        write = self.term.write
+        rows = rows.tolist()
+        for i, x0, x1 in zip(starts_y.tolist(), starts_x.tolist(), (ends_x + 1).tolist()):
+            y = rows[i]
+            text = new.chars[y, x0:x1].tostring().decode("utf-32-le")
+            write(x0, y, text, int(new.attrs[y, x0]))
+
+
+def create_root_canvas(term, width, height, use_numpy = False):
+    # falls back to the pure-python canvas when numpy is missing
+    if use_numpy and numpy is not None:
+        return NumpyRootCanvas(term, width, height)
+    return RootCanvas(term, width, height)
+
+
+class ScrolledCanvas(Canvas):
+    # a virtual surface, larger than the area it occupies in its parent: the content
+    # is rendered once into a backing grid, and scrolling only moves the viewport, whose
+    # slice is then blitted into the parent. width and height are the virtual size
+    __slots__ = ["buffer", "blank", "view_width", "view_height", "scroll_x", "scroll_y"]
+    
+    def __init__(self, parent, offx, offy, width, height, virtual_width, virtual_height):
+        self.parent = parent
+        self.offx = offx
+        self.offy = offy
+        self.view_width = max(width, 0)
+        self.view_height = max(height, 0)
+        self.width = max(virtual_width, 0)
+        self.height = max(virtual_height, 0)
+        # subcanvases write into the backing grid, in virtual coordinates
+        self.root = self
+        self.absx = self.absy = 0
+        self.clip_left = self.clip_top = 0
+        self.clip_right = self.width
+        self.clip_bottom = self.height
+        self.scroll_x = self.scroll_y = 0
+        self.buffer = CellGrid(self.width, self.height)
+        self.blank = None
+    
+    def attach(self, parent, offx = 0, offy = 0, width = -1, height = -1):
+        # moves the viewport to another parent canvas (e.g., after remodelling), 
+        # keeping the backing grid
+        self.parent = parent
+        self.offx = offx
+        self.offy = offy
+        self.view_width = max(parent.width - offx if width == -1 else width, 0)
+        self.view_height = max(parent.height - offy if height == -1 else height, 0)
+        self.scroll_to(self.scroll_x, self.scroll_y)
+    
+    def clear(self):
+        # the backing grid is cleared in place, against a blank grid that's allocated
+        # on the first clear
+        if self.blank is None:
+            self.blank = CellGrid(self.width, self.height)
+        self.buffer.clear(self.blank)
+    
+    def scroll_to(self, x, y):
+        self.scroll_x = max(min(x, self.width - self.view_width), 0)
+        self.scroll_y = max(min(y, self.height - self.view_height), 0)
+    def scroll_by(self, dx, dy):
+        self.scroll_to(self.scroll_x + dx, self.scroll_y + dy)
+    
+    def blit_view(self):
+        self.parent.blit(self.offx, self.offy, self.buffer, self.scroll_x, self.scroll_y, 
+            self.view_width, self.view_height)
+    
+    def _write(self, x, y, text, aid):
+        self.buffer.put(x, y, text, aid)
+    def _blit(self, x, y, grid, srcx, srcy, width, height):
+        self.buffer.blit(x, y, grid, srcx, srcy, width, height)
 
 
 
@@ -1,3 +1,6 @@
+import re
+
+
 class TerminalEvent(object):
     __slots__ = []
 
@@ -5,6 +8,8 @@ class TerminalEvent(object):
 SHIFT = 1
 CTRL = 2
 ALT = 4
+# mouse events only: the pointer moved with a button held
+MOTION = 8
 
 KEY_ESC = "esc"
 KEY_ENTER = "enter"
@@ -79,10 +84,26 @@ MODIFIER_NAMES = {"ctrl" : CTRL, "control" : CTRL, "meta" : ALT, "alt" : ALT, "s
 
 
 class KeyEvent(TerminalEvent):
-    __slots__ = ["name", "flags"]
-    def __init__(self, name, flags = 0):
-        self.name = name
-        self.flags = flags
+    # instances are interned, one per (name, flags), so they're compared by identity; 
+    # they mustn't be modified
+    __slots__ = ["name", "flags", "_hash"]
+    _instances = {}
+    # key strings (as given to from_string) and their events
+    _strings = {}
+    
+    def __new__(cls, name, flags = 0):
+        try:
+            return cls._instances[name, flags]
+        except KeyError:
+            self = TerminalEvent.__new__(cls)
+            self.name = name
+            self.flags = flags
+            self._hash = hash((name, flags))
+            cls._instances[name, flags] = self
+            return self
+    
+    def __reduce__(self):
+        return (self.__class__, (self.name, self.flags))
     
     @classmethod
     def _canonize_keystring(cls, text):
@@ -114,8 +135,11 @@ class KeyEvent(TerminalEvent):
     
     @classmethod
     def from_string(cls, text):
-        name, flags = cls._canonize_keystring(text)
-        return cls(name, flags)
+        try:
+            return cls._strings[text]
+        except KeyError:
+            evt = cls._strings[text] = cls(*cls._canonize_keystring(text))
+            return evt
 
     def as_char(self):
         if self.flags == 0 and len(self.name) == 1:
@@ -136,16 +160,21 @@ class KeyEvent(TerminalEvent):
         return "<" + " ".join(attrs) + ">"
 
     def __eq__(self, other):
-        if isinstance(other, KeyEvent):
-            return self.name == other.name and self.flags == other.flags
+        cls = other.__class__
+        if cls is str or cls is unicode:
+            # most often, a key string that's been seen before
+            evt = self._strings.get(other)
+            return self is (evt if evt is not None else self.from_string(other))
+        elif cls is KeyEvent or isinstance(other, KeyEvent):
+            return self is other
         elif isinstance(other, basestring):
-            return (self.name, self.flags) == self._canonize_keystring(other)
+            return self is self.from_string(other)
         else:
             return NotImplemented
     def __ne__(self, other):
         return not (self == other)
     def __hash__(self):
-        return hash(self.name)
+        return self._hash
 
 InvalidKeyEvent = KeyEvent(u"\ufffd")
 
@@ -157,9 +186,20 @@ class MouseEvent(TerminalEvent):
     BTN3 = 3
     BTN4 = 4
     BTN5 = 5
+    BTN6 = 6
+    BTN7 = 7
+    BTN8 = 8
+    BTN9 = 9
+    BTN10 = 10
+    BTN11 = 11
     BTN_RELEASE = -1
+    BTN_UNKNOWN = 0
+    # the button is encoded in the low two bits, plus bit 6 for buttons 4-7 (the 
+    # wheel) and bit 7 for buttons 8-11
+    _BUTTON_BITS = 3 | 64 | 128
     _raw_to_button = {0 : BTN1, 1 : BTN2, 2 : BTN3, 3 : BTN_RELEASE,
-        64 : BTN4, 65 : BTN5}
+        64 : BTN4, 65 : BTN5, 66 : BTN6, 67 : BTN7, 
+        128 : BTN8, 129 : BTN9, 130 : BTN10, 131 : BTN11}
     
     def __init__(self, x, y, btn, flags = 0):
         self.x = x
@@ -173,14 +213,43 @@ class MouseEvent(TerminalEvent):
         else:
             return "MouseEvent(%r, %r, %r)" % (self.x, self.y, self.btn)
     
+    @classmethod
+    def _get_button(cls, b):
+        if b < 0 or b > 255:
+            return cls.BTN_UNKNOWN
+        return cls._raw_to_button.get(b & cls._BUTTON_BITS, cls.BTN_UNKNOWN)
+    
     @classmethod
     def _parse(cls, b1, b2, b3):
         b = ord(b1) - 32
         x = ord(b2) - 33
         y = ord(b3) - 33
-        btn = cls._raw_to_button[(b & 3) | (((b >> 6) & 1) << 6)]
-        flags = (SHIFT if b & 4 else 0) | (ALT if b & 8 else 0) | (CTRL if b & 16 else 0)
+        btn = cls._get_button(b)
+        flags = (SHIFT if b & 4 else 0) | (ALT if b & 8 else 0) | (CTRL if b & 16 else 0) | \
+            (MOTION if b & 32 else 0)
         return cls(x, y, btn, flags)
+    
+    @classmethod
+    def _parse_sgr(cls, b, x, y, final):
+        # SGR (1006) reports: \e[<b;x;yM for presses and motion, \e[<b;x;ym for releases,
+        # with decimal, 1-based coordinates
+        b = int(b)
+        if final == "m":
+            btn = cls.BTN_RELEASE
+        else:
+            btn = cls._get_button(b)
+        flags = (SHIFT if b & 4 else 0) | (ALT if b & 8 else 0) | (CTRL if b & 16 else 0) | \
+            (MOTION if b & 32 else 0)
+        return cls(int(x) - 1, int(y) - 1, btn, flags)
+
+
+class PasteEvent(TerminalEvent):
+    # text pasted in bracketed paste mode, delivered as a whole rather than as keys
+    __slots__ = ["text"]
+    def __init__(self, text):
+        self.text = text
+    def __repr__(self):
+        return "PasteEvent(%r)" % (self.text,)
 
 
 class ResizedEvent(TerminalEvent):
@@ -190,6 +259,14 @@ class ResizedEvent(TerminalEvent):
 ResizedEvent = ResizedEvent()
 
 
+class OutputDrainedEvent(TerminalEvent):
+    # the terminal has caught up with the output that was queued for it
+    __slots__ = []
+    def __repr__(self):
+        return "<%s>" % (self.__class__.__name__,)
+OutputDrainedEvent = OutputDrainedEvent()
+
+
 def _get_mouse_1(byte1):
     def _get_mouse_2(byte2):
         def _get_mouse_3(byte3):
@@ -344,6 +421,198 @@ class KeysTrie(object):
         return self._decode(None)
 
 
-terminal_keys_trie = KeysTrie(sequences)
+PASTE_START = "\x1b[200~"
+PASTE_END = "\x1b[201~"
+
+# sequences that carry parameters, as (prefix, pattern, partial pattern, factory); the 
+# factory gets the pattern's groups (there has to be at least one). the partial 
+# pattern matches what may still become a complete sequence
+parameterized_sequences = [
+    ("\x1b[M", r"\x1b\[M(.)(.)(.)", r"\x1b\[M.{0,2}\Z", MouseEvent._parse),
+    ("\x1b[<", r"\x1b\[<(\d+);(\d+);(\d+)([Mm])", r"\x1b\[<[\d;]*\Z", 
+        MouseEvent._parse_sgr),
+    (PASTE_START, r"\x1b\[200~(.*?)\x1b\[201~", 
+        r"\x1b\[200~(?:(?!\x1b\[201~).)*\Z", PasteEvent),
+]
+
+
+class _CharEvents(dict):
+    # the event of each ordinary character
+    __slots__ = []
+    def __missing__(self, ch):
+        evt = self[ch] = KeyEvent(ch)
+        return evt
+
+
+class KeysDecoder(object):
+    """Decodes the input a chunk at a time, producing the same events as KeysTrie. 
+    A single regex, built from the sequences, matches either a run of ordinary 
+    characters, a complete sequence or a parameterized one; only incomplete or
+    invalid sequences (and the escape key, which prefixes the others) are looked 
+    up one character at a time, in flat tables of sequences and their prefixes"""
+    
+    def __init__(self, keys, parameterized = ()):
+        self.leaves = {}
+        self.prefixes = set()
+        for seq, info in keys.iteritems():
+            if callable(info):
+                # trie-style handlers are superseded by the parameterized sequences
+                self.prefixes.update(seq[:i] for i in range(1, len(seq) + 1))
+                continue
+            self.leaves[seq] = info
+            self.prefixes.update(seq[:i] for i in range(1, len(seq)))
+        starts = set(seq[0] for seq in self.leaves) | set(seq[0] for seq in self.prefixes)
+        plain = "[^%s]+" % ("".join(re.escape(ch) for ch in sorted(starts)),)
+        # the complete sequences that aren't also a prefix of another (that is, all 
+        # but the escape key), as a regex shaped like the trie
+        complete = self._trie_to_regex([seq for seq in self.leaves if seq not in self.prefixes])
+        # group 1 is a run of ordinary characters and group 2 a complete sequence; the 
+        # parameterized ones follow, each in a group of its own
+        alternatives = ["(%s)" % (plain,), "(%s)" % (complete,)]
+        self.factories = {}
+        self.partials = []
+        for prefix, pattern, partial_pattern, factory in parameterized:
+            self.prefixes.update(prefix[:i] for i in range(1, len(prefix)))
+            group = 1 + sum(re.compile(alt).groups for alt in alternatives)
+            count = re.compile(pattern).groups
+            self.factories[group] = (factory, group + 1, group + count)
+            self.partials.append((prefix, re.compile(partial_pattern, re.DOTALL), factory))
+            alternatives.append("(%s)" % (pattern,))
+        self.pattern = re.compile("|".join(alternatives), re.DOTALL)
+        self.char_events = _CharEvents()
+        self.reset()
+    
+    @classmethod
+    def _trie_to_regex(cls, seqs):
+        # seqs must be prefix-free
+        children = {}
+        for seq in seqs:
+            children.setdefault(seq[0], []).append(seq[1:])
+        ends = []
+        branches = []
+        for ch, rest in sorted(children.items()):
+            if rest == [""]:
+                ends.append(re.escape(ch))
+            else:
+                branches.append(re.escape(ch) + cls._trie_to_regex(rest))
+        if len(ends) > 1:
+            branches.append("[%s]" % ("".join(ends),))
+        else:
+            branches.extend(ends)
+        return branches[0] if len(branches) == 1 else "(?:%s)" % ("|".join(branches),)
+    
+    def reset(self):
+        # an incomplete sequence, held until the rest of it arrives (or pull is called)
+        self.pending = ""
+        # set once part of a paste was released by pull: what follows is still pasted
+        # text, up to the end marker
+        self.in_paste = False
+    
+    def decode(self, data):
+        if self.pending:
+            data = self.pending + data
+            self.pending = ""
+        events = []
+        match_token = self.pattern.match
+        char_event = self.char_events.__getitem__
+        leaves = self.leaves
+        factories = self.factories
+        i = self._decode_paste(data, events) if self.in_paste else 0
+        n = len(data)
+        while i < n:
+            match = match_token(data, i)
+            if not match:
+                i = self._decode_sequence(data, i, events)
+                continue
+            group = match.lastindex
+            if group == 1:
+                events.extend(map(char_event, match.group(1)))
+            elif group == 2:
+                events.append(leaves[match.group(2)])
+            else:
+                factory, first, last = factories[group]
+                evt = factory(*match.groups()[first - 1:last])
+                prev = events[-1] if events else None
+                if evt.__class__ is MouseEvent and prev.__class__ is MouseEvent and \
+                        evt.flags & MOTION and prev.flags == evt.flags and prev.btn == evt.btn:
+                    # a drag reports every cell it crosses; of a run of motion events, 
+                    # only the latest position matters
+                    events[-1] = evt
+                else:
+                    events.append(evt)
+            i = match.end()
+        return events
+    
+    def _decode_paste(self, data, events):
+        # decodes the rest of a paste that pull released part of, as more PasteEvents.
+        # returns where the next token starts
+        end = data.find(PASTE_END)
+        if end >= 0:
+            if end:
+                events.append(PasteEvent(data[:end]))
+            self.in_paste = False
+            return end + len(PASTE_END)
+        n = len(data) - self._cut_off_end(data)
+        if n:
+            events.append(PasteEvent(data[:n]))
+        self.pending = data[n:]
+        return len(data)
+    
+    @classmethod
+    def _cut_off_end(cls, text):
+        # the length of the beginning of an end marker that text ends with
+        for i in range(len(PASTE_END) - 1, 0, -1):
+            if text.endswith(PASTE_END[:i]):
+                return i
+        return 0
+    
+    def _decode_sequence(self, data, i, events):
+        # decodes what the regex didn't match at i: an escape, an incomplete or an
+        # invalid sequence. returns where the next token starts
+        for prefix, partial_pattern, _ in self.partials:
+            if data.startswith(prefix, i) and partial_pattern.match(data, i):
+                self.pending = data[i:]
+                return len(data)
+        prefixes = self.prefixes
+        n = len(data)
+        j = i
+        while j < n:
+            seq = data[i:j + 1]
+            if seq in prefixes:
+                j += 1
+                continue
+            evt = self.leaves.get(seq)
+            if evt is None:
+                # like the trie, the unexpected character is consumed
+                if j == i:
+                    evt = KeyEvent(data[j])
+                elif j == i + 1 and data[i] == "\x1b":
+                    evt = KeyEvent(data[j], ALT)
+                else:
+                    evt = InvalidKeyEvent
+            events.append(evt)
+            return j + 1
+        self.pending = data[i:]
+        return n
+    
+    def pull(self):
+        # the input is taken to be complete: a pending sequence that's also a complete
+        # one (a lone escape) becomes its event, and any other one (including a cut off
+        # parameterized sequence) is invalid. a paste that stalled is delivered as far
+        # as it got, and the decoder stays in the paste, so the rest of it isn't taken
+        # for keys; a cut off end marker keeps waiting
+        pending = self.pending
+        if not pending or self.in_paste:
+            return None
+        self.reset()
+        for prefix, partial_pattern, factory in self.partials:
+            if factory is PasteEvent and pending.startswith(prefix):
+                text = pending[len(prefix):]
+                n = len(text) - self._cut_off_end(text)
+                self.pending = text[n:]
+                self.in_paste = True
+                return PasteEvent(text[:n]) if n else None
+        return self.leaves.get(pending, InvalidKeyEvent)
 
 
+terminal_keys_decoder = KeysDecoder(sequences, parameterized_sequences)
@@ -8,13 +8,15 @@ class StyleElement(object):
 
 
 class Style(object):
-    __slots__ = ["_elements", "_values"]
+    __slots__ = ["_elements", "_values", "version"]
     
     def __init__(self, **elements):
         for k, v in elements.iteritems():
             if v.fallback and v.fallback not in elements:
                 raise ValueError("nonexisting fallback key for %r: %r" % (k, v.fallback))
         object.__setattr__(self, "_elements", elements)
+        # bumped on every change, so cached renderings can tell they are stale
+        object.__setattr__(self, "version", 0)
         
     
     def __str__(self):
@@ -38,6 +40,7 @@ class Style(object):
     def __setitem__(self, key, value):
         elem = self._elements[key]
         elem.value = value
+        object.__setattr__(self, "version", self.version + 1)
     
     def __getattr__(self, name):
         try:
@@ -4,6 +4,7 @@ import signal
 import fcntl
 import struct
 import errno
+import time
 import select
 import curses
 import termios
@@ -11,8 +12,9 @@ import locale
 import re
 import codecs
 import tty
-from events import ResizedEvent, terminal_keys_trie
-from canvas import RootCanvas
+from events import ResizedEvent, OutputDrainedEvent, terminal_keys_decoder
+from canvas import create_root_canvas, attr_table
+from terminfo import get_formatter
 
 
 class NoopCodec(object):
@@ -28,9 +30,34 @@ NoopCodec = NoopCodec()
 
 class Terminal(object):
     MAX_IO_CHUNK = 16000
+    # with non-blocking output, frames are dropped while more than this many bytes
+    # are still queued for the terminal
+    MAX_OUTPUT_BACKLOG = 4096
+    CONTROL_CHARS = re.compile(u"[\x00-\x1f]")
+    # runs of a repeated character are sent with rep, and runs of blanks with ech or
+    # el, when the terminal supports them and it's shorter
+    ENCODE_RUNS = True
+    MIN_RUN = 5
+    RUN_PATTERN = re.compile(u"(.)\\1{%d,}" % (MIN_RUN - 1,), re.DOTALL)
+    # compute the cheapest attribute transition, instead of always resetting and 
+    # re-applying the attributes
+    MINIMAL_SGR = True
+    SGR_PATTERN = re.compile(r"^\x1b\[([0-9;]*)m$")
+    # ECMA-48 codes that turn off a single attribute (22 is "normal intensity", so it
+    # turns off both bold and dim)
+    SGR_OFF = dict(bold = "22", dim = "22", underlined = "24", blink = "25", inversed = "27",
+        fg = "39", bg = "49")
+    # synchronized output (DEC private mode 2026): the terminal holds off drawing 
+    # between the two sequences, so a frame appears at once
+    SYNC_BEGIN = "\x1b[?2026h"
+    SYNC_END = "\x1b[?2026l"
+    SYNC_QUERY_TIMEOUT = 0.2
+    DECRQM_RESPONSE = re.compile(r"\x1b\[\?2026;(\d)\$y")
+    DA1_RESPONSE = re.compile(r"\x1b\[\?[\d;]*c")
     
     def __init__(self, fd = sys.stdout, termtype = None, exec_in_tty = False, 
-            raw_mode = True, use_mouse = False):
+            raw_mode = True, use_mouse = False, use_sync_output = False, 
+            nonblocking_output = False, bracketed_paste = True, use_numpy_canvas = False):
         if hasattr(fd, "fileno"):
             fd.flush()
             fd = fd.fileno()
@@ -40,7 +67,22 @@ class Terminal(object):
         self._termtype = termtype
         self._raw_mode = raw_mode
         self._use_mouse = use_mouse
-        self._buffer = ""
+        self._bracketed_paste = bracketed_paste
+        self._use_numpy_canvas = use_numpy_canvas
+        self._use_sync_output = use_sync_output
+        self._nonblocking_output = nonblocking_output
+        self._output_queue = []
+        self._output_offset = 0
+        self.output_backlog = 0
+        self._was_backlogged = False
+        # a self-pipe, through which other threads wake up a waiting get_event
+        self._wakeup_fds = None
+        self.sync_output = False
+        # the frame's output is gathered as segments, which are joined and encoded 
+        # once, on commit
+        self._segments = []
+        self.bytes_written = 0
+        self.frame_bytes = 0
         # state
         self._events = []
         if not self.encoding or self.encoding == "ascii":
@@ -84,6 +126,13 @@ class Terminal(object):
         val = curses.tigetstr(cap) or ''
         return re.sub(r'\$<\d+>[/*]?', '', val)
     
+    @classmethod
+    def _tigetfunc(cls, cap):
+        template = cls._tigetstr(cap)
+        if not template:
+            return None
+        return get_formatter(template)
+    
     def _enter_cbreak(self):
         self._orig_termios_mode = termios.tcgetattr(self.fd)
         if self._raw_mode:
@@ -100,33 +149,81 @@ class Terminal(object):
     def _leave_keypad(self):
         self._write(self._tigetstr("rmkx"))
     
+    def _query_sync_output(self):
+        # terminals that define the (extended) Sync capability support mode 2026; 
+        # otherwise, the mode is queried with DECRQM, followed by a primary device
+        # attributes request that every terminal answers: if that answer comes first,
+        # the mode is unsupported. any other input read meanwhile is kept as events
+        if self._tigetstr("Sync"):
+            return True
+        self._write("\x1b[?2026$p\x1b[c")
+        data = ""
+        deadline = time.time() + self.SYNC_QUERY_TIMEOUT
+        while not self.DA1_RESPONSE.search(data):
+            remaining = deadline - time.time()
+            if remaining <= 0 or not self._wait_input(remaining):
+                break
+            data += self._read(500)
+        match = self.DECRQM_RESPONSE.search(data)
+        data = self.DA1_RESPONSE.sub("", self.DECRQM_RESPONSE.sub("", data))
+        if data:
+            self._events.extend(terminal_keys_decoder.decode(self._decoder.decode(data)))
+        # 1 and 2 mean set and reset; 0 (unrecognized) and 4 (permanently reset) don't do
+        return bool(match) and match.group(1) in ("1", "2")
+    
     def _enter_mouse_mode(self):
-        self._write("\x1b[?1000;h")
+        # button presses (1000) and motion while a button is held (1002), reported in
+        # the SGR format (1006) by terminals that support it, which isn't limited to 
+        # 223 columns and rows
+        self._write("\x1b[?1000h\x1b[?1002h\x1b[?1006h")
     
     def _leave_mouse_mode(self):
-        self._write("\x1b[?1000;l")
+        self._write("\x1b[?1006l\x1b[?1002l\x1b[?1000l")
+    
+    def _enter_paste_mode(self):
+        # pasted text comes between \e[200~ and \e[201~, and is decoded as a PasteEvent
+        self._write("\x1b[?2004h")
+    
+    def _leave_paste_mode(self):
+        self._write("\x1b[?2004l")
     
     @classmethod
     def _init_colors(cls, ansi_cmd, native_cmd):
         ansi = ["black", "red", "green", "yellow", "blue", "magenta", "cyan", "white"]
         native = ["black", "blue", "green", "cyan", "red", "magenta", "yellow", "white"]
         coll = dict((name, "") for name in ansi)
-        template = cls._tigetstr(ansi_cmd)
-        if template:
+        func = cls._tigetfunc(ansi_cmd)
+        if func:
             for i, name in enumerate(ansi):
-                coll[name] = curses.tparm(template, i)
+                coll[name] = func(i)
         else:
-            template = cls._tigetstr(native_cmd)
-            if template:
+            func = cls._tigetfunc(native_cmd)
+            if func:
                 for i, name in enumerate(ansi):
-                    coll[name] = curses.tparm(template, i)
+                    coll[name] = func(i)
         return coll
     
     def _init_caps(self):
         curses.setupterm(self._termtype, self.fd)
         self.CURSOR_HIDE = self._tigetstr("civis")
         self.CURSOR_SHOW = self._tigetstr("cnorm")
-        self.CURSOR_MOVE = lambda x, y, _template = self._tigetstr("cup"): curses.tparm(_template, y, x)
+        self._cup = self._tigetfunc("cup")
+        self._cup_rows = {}
+        self.CURSOR_MOVE = self._cursor_move
+        self.COLUMN_ADDRESS = self._tigetfunc("hpa")
+        self.ROW_ADDRESS = self._tigetfunc("vpa")
+        self.PARM_RIGHT = self._tigetfunc("cuf")
+        self.PARM_LEFT = self._tigetfunc("cub")
+        self.PARM_DOWN = self._tigetfunc("cud")
+        self.PARM_UP = self._tigetfunc("cuu")
+        self.CURSOR_RIGHT = self._tigetstr("cuf1")
+        self.CURSOR_LEFT = self._tigetstr("cub1")
+        self.CURSOR_DOWN = self._tigetstr("cud1")
+        self.CURSOR_UP = self._tigetstr("cuu1")
+        if self.CURSOR_DOWN == "\n" and not self._raw_mode:
+            # the tty would translate it to CR LF
+            self.CURSOR_DOWN = ""
+        self._cursor = None
         self.CLEAR_SCREEN = self._tigetstr("clear")
         self.RESET_ATTRS = self._tigetstr("sgr0")
         self.TEXT_ATTRS = dict(
@@ -138,6 +235,34 @@ class Terminal(object):
             fg = self._init_colors("setaf", "setf"),
             bg = self._init_colors("setab", "setb"),
         )
+        self._sgr_cache = {}
+        # terminals whose attribute caps are plain SGR sequences also understand the
+        # individual off codes, and several codes can be merged into a single sequence
+        caps = [self.TEXT_ATTRS[key] for key in ("bold", "blink", "dim", "inversed", "underlined")]
+        caps.extend(self.TEXT_ATTRS["fg"].values())
+        caps.extend(self.TEXT_ATTRS["bg"].values())
+        self._ansi_sgr = bool(self._tigetstr("setaf")) and \
+            all(self._sgr_params(cap) is not None for cap in caps if cap)
+        self.SCROLL_REGION = self._tigetfunc("csr")
+        self.SCROLL_FORWARD = self._tigetstr("ind")
+        self.SCROLL_REVERSE = self._tigetstr("ri")
+        self.PARM_SCROLL_FORWARD = self._tigetfunc("indn")
+        self.PARM_SCROLL_REVERSE = self._tigetfunc("rin")
+        self.DELETE_LINES = self._tigetfunc("dl")
+        self.INSERT_LINES = self._tigetfunc("il")
+        self.ERASE_CHARS = self._tigetfunc("ech")
+        self.CLEAR_EOL = self._tigetstr("el")
+        # rep formats the character along with the count; it is only used if the 
+        # character comes first, so that any (non-latin) character can precede it
+        self.REPEAT_CHAR = None
+        rep = self._tigetfunc("rep")
+        if rep and rep(ord("a"), 5).startswith("a"):
+            self.REPEAT_CHAR = lambda count: rep(ord("a"), count)[1:]
+        self._erasable = {}
+        self._scroll_with_region = bool(self.SCROLL_REGION and 
+            (self.SCROLL_FORWARD or self.PARM_SCROLL_FORWARD) and 
+            (self.SCROLL_REVERSE or self.PARM_SCROLL_REVERSE))
+        self.can_scroll = self._scroll_with_region or bool(self.DELETE_LINES and self.INSERT_LINES)
 
     def _get_size(self):
         buf = fcntl.ioctl(self.fd, termios.TIOCGWINSZ, "abcd")
@@ -148,38 +273,100 @@ class Terminal(object):
         if ResizedEvent not in self._events:
             self._events.append(ResizedEvent)
         self._width, self._height = self._get_size()
+        self._cursor = None
+        self._cup_rows = {}
 
     #=========================================================================
     # IO
     #=========================================================================
     def _write(self, data):
         data = self._encoder(data)[0]
-        while data:
-            chunk = data[:self.MAX_IO_CHUNK]
+        self.bytes_written += len(data)
+        if self._nonblocking_output:
+            self._output_queue.append(data)
+            self.output_backlog += len(data)
+            self._flush_output()
+            return
+        # partial writes advance an offset into a view of the data, rather than copy it
+        view = memoryview(data)
+        offset = 0
+        while offset < len(data):
             try:
-                count = os.write(self.fd, chunk)
+                offset += os.write(self.fd, view[offset:])
             except OSError, ex:
-                if ex.errno == errno.EINTR:
-                    count = 0
-                else:
+                if ex.errno != errno.EINTR:
                     raise
-            data = data[count:]
+    
+    def _flush_output(self):
+        # writes as much of the queued output as the terminal takes without blocking;
+        # if a frame was refused meanwhile, an OutputDrainedEvent is queued once it's 
+        # all out
+        while self._output_queue:
+            data = self._output_queue[0]
+            try:
+                count = os.write(self.fd, memoryview(data)[self._output_offset:])
+            except OSError, ex:
+                if ex.errno == errno.EINTR:
+                    continue
+                if ex.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                    return
+                raise
+            self._output_offset += count
+            self.output_backlog -= count
+            if self._output_offset >= len(data):
+                self._output_queue.pop(0)
+                self._output_offset = 0
+        if self._was_backlogged:
+            self._was_backlogged = False
+            self._events.append(OutputDrainedEvent)
+    
+    def _set_nonblocking(self, nonblocking):
+        flags = fcntl.fcntl(self.fd, fcntl.F_GETFL)
+        if nonblocking:
+            flags |= os.O_NONBLOCK
+        else:
+            flags &= ~os.O_NONBLOCK
+        fcntl.fcntl(self.fd, fcntl.F_SETFL, flags)
     
     def _read(self, count):
         return os.read(self.fd, min(count, self.MAX_IO_CHUNK))
     
     def _wait_input(self, timeout = None):
+        # queued output is flushed while waiting, until the drained event comes up
         if timeout is not None and timeout < 0:
             timeout = 0
-        try:
-            rl, _, _ = select.select([self.fd], [], [], timeout)
-        except select.error, ex:
-            if ex.args[0] == errno.EINTR:
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            wl = [self.fd] if self._output_queue else []
+            rl = [self.fd, self._wakeup_fds[0]] if self._wakeup_fds else [self.fd]
+            try:
+                rl, wl, _ = select.select(rl, wl, [], timeout)
+            except select.error, ex:
+                if ex.args[0] == errno.EINTR:
+                    return False
+                else:
+                    raise
+            if rl:
+                if self._wakeup_fds and self._wakeup_fds[0] in rl:
+                    self._drain_wakeup()
+                    return self.fd in rl
+                return True
+            if not wl:
                 return False
-            else:
-                raise
-        return bool(rl)
+            self._flush_output()
+            if self._events:
+                return False
+            if deadline is not None:
+                timeout = max(deadline - time.time(), 0)
     
+    def _drain_wakeup(self):
+        try:
+            while os.read(self._wakeup_fds[0], 512):
+                pass
+        except OSError, ex:
+            if ex.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINTR):
+                raise
+
     def _read_all(self):
         data = []
         while self._wait_input(0):
@@ -221,12 +408,18 @@ class Terminal(object):
                 raise ValueError("fd must be a tty")
 
         self._init_caps()
-        self._orig_sigwinch = signal.signal(signal.SIGWINCH, self._sigwinch)
+        self._install_handlers()
         self._sigwinch()
         self._enter_cbreak()
+        if self._nonblocking_output:
+            self._set_nonblocking(True)
         self._leave_keypad()
+        if self._use_sync_output:
+            self.sync_output = self._query_sync_output()
         if self._use_mouse:
             self._enter_mouse_mode()
+        if self._bracketed_paste:
+            self._enter_paste_mode()
         self.clear_screen()
         self.hide_cursor()
         self._initialized = True
@@ -234,13 +427,32 @@ class Terminal(object):
     def restore(self):
         if not self._initialized:
             raise ValueError("not initialized")
-        signal.signal(signal.SIGWINCH, self._orig_sigwinch)
+        self._remove_handlers()
+        if self._nonblocking_output:
+            # whatever is still queued is written out, blocking
+            self._set_nonblocking(False)
+            self._flush_output()
         if self._use_mouse:
             self._leave_mouse_mode()
+        if self._bracketed_paste:
+            self._leave_paste_mode()
         self._leave_cbreak()
         self.show_cursor()
         self.reset_attrs()
         self._initialized = False
+    
+    def _install_handlers(self):
+        # the SIGWINCH handler and the wakeup pipe, which get_event waits on
+        self._orig_sigwinch = signal.signal(signal.SIGWINCH, self._sigwinch)
+        self._wakeup_fds = os.pipe()
+        for fd in self._wakeup_fds:
+            fcntl.fcntl(fd, fcntl.F_SETFL, fcntl.fcntl(fd, fcntl.F_GETFL) | os.O_NONBLOCK)
+    
+    def _remove_handlers(self):
+        signal.signal(signal.SIGWINCH, self._orig_sigwinch)
+        wakeup_fds, self._wakeup_fds = self._wakeup_fds, None
+        for fd in wakeup_fds:
+            os.close(fd)
 
     def hide_cursor(self):
         self._cursor_visible = False
@@ -256,61 +468,316 @@ class Terminal(object):
     def clear_screen(self):
         self.reset_attrs()
         self._write(self.CLEAR_SCREEN)
+        self._cursor = None
     
     def get_size(self):
         return self._width, self._height
     
+    def wakeup(self):
+        """Makes a get_event that's waiting for input (or the next one) return; 
+        unlike the rest of the terminal, it can be called from any thread"""
+        fds = self._wakeup_fds
+        if fds is None:
+            return
+        try:
+            os.write(fds[1], "\0")
+        except OSError, ex:
+            # EAGAIN means the pipe is full, so a wakeup is pending anyway; EBADF means
+            # the terminal was restored meanwhile
+            if ex.errno not in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EBADF, errno.EINTR):
+                raise
+    
     def _get_event(self, timeout):
         if not self._events:
             self._wait_input(timeout)
         data = self._read_all()
         output = self._decoder.decode(data)
         if output:
-            self._events.extend(terminal_keys_trie.decode(output))
+            self._events.extend(terminal_keys_decoder.decode(output))
     
     def get_event(self, timeout = None, char_completion_timeout = 0.05):
         # note that we might get a ResizedEvent at any given time
         self._get_event(timeout)
-        if not self._events:
+        if not self._events and terminal_keys_decoder.pending:
+            # the rest of a partially received sequence may still be on its way
             self._get_event(char_completion_timeout)
             if not self._events:
-                evt = terminal_keys_trie.pull()
+                evt = terminal_keys_decoder.pull()
                 if evt:
                     self._events.append(evt)
         
         return self._events.pop(0) if self._events else None
 
-    def write(self, x, y, text, attrs = {}):
-        reset = False
-        for key, val in self._attrs.iteritems():
-            new = attrs.get(key, None)
-            if new != val:
-                reset = True
-                self._attrs[key] = new
-        caps = [self.CURSOR_MOVE(x, y)]
-        if reset:
-            caps.append(self.RESET_ATTRS)
-            for key, val in self._attrs.iteritems():
-                if val:
-                    if type(val) is bool:
-                        caps.append(self.TEXT_ATTRS[key])
-                    else:
-                        caps.append(self.TEXT_ATTRS[key][val])
-        text2 = [ch if ord(ch) >= 32 else u"\ufffd" for ch in text]
-        self._buffer += "".join(caps) + "".join(text2)
+    def write(self, x, y, text, attrs = 0):
+        # attrs is an id interned in the global attr_table, or a dict of attributes
+        if attrs.__class__ is not int:
+            attrs = attr_table.intern(attrs)
+        segments = self._segments
+        segments.append(self._move_cursor(x, y))
+        if attrs != self._attr_id:
+            segments.append(self._get_sgr(self._attr_id, attrs))
+            self._attr_id = attrs
+        text = self.CONTROL_CHARS.sub(u"\ufffd", unicode(text))
+        if x + len(text) < self._width:
+            cursor = (x + len(text), y)
+        else:
+            # at the last column, terminals differ on where the cursor goes
+            cursor = None
+        if self.ENCODE_RUNS and len(text) >= self.MIN_RUN:
+            text, cursor = self._encode_runs(x, y, text, cursor)
+        segments.append(text)
+        self._cursor = cursor
+    
+    def _is_erasable(self, aid):
+        # erased cells take the current background, but neither inverse nor underline
+        try:
+            return self._erasable[aid]
+        except KeyError:
+            attrs = attr_table[aid]
+            res = self._erasable[aid] = not (attrs["bg"] or attrs["inversed"] or attrs["underlined"])
+            return res
+    
+    def _encode_runs(self, x, y, text, cursor):
+        pieces = []
+        pos = 0
+        for match in self.RUN_PATTERN.finditer(text):
+            start, end = match.span()
+            ch = text[start]
+            count = end - start
+            last = end == len(text)
+            best = None
+            best_len = len(self._encoder(ch)[0]) * count
+            if self.REPEAT_CHAR:
+                seq = ch + self.REPEAT_CHAR(count)
+                if len(self._encoder(seq)[0]) < best_len:
+                    best, best_len = seq, len(self._encoder(seq)[0])
+            # ech and el leave the cursor where it is
+            if ch == u" " and self._is_erasable(self._attr_id):
+                seq = None
+                if last and x + end == self._width and self.CLEAR_EOL:
+                    seq = self.CLEAR_EOL
+                elif self.ERASE_CHARS:
+                    seq = self.ERASE_CHARS(count)
+                    if not last:
+                        move = self._get_horizontal_move(x + start, x + end)
+                        seq = seq + move if move else None
+                if seq and len(seq) < best_len:
+                    best, best_len = seq, len(seq)
+                    if last:
+                        cursor = (x + start, y)
+            if best is not None:
+                pieces.append(text[pos:start])
+                pieces.append(best)
+                pos = end
+        if not pieces:
+            return text, cursor
+        pieces.append(text[pos:])
+        return u"".join(pieces), cursor
+    
+    def _cursor_move(self, x, y):
+        # the cup strings are looked up in per-row tables, filled in on first use
+        row = self._cup_rows.get(y)
+        if row is None:
+            row = self._cup_rows[y] = [self._cup(y, i) for i in xrange(self._width)]
+        if 0 <= x < len(row):
+            return row[x]
+        return self._cup(y, x)
+    
+    def _move_cursor(self, x, y):
+        # returns the shortest sequence that moves the cursor from its known position
+        # (if any) to (x, y), among absolute, row/column and relative moves
+        cur = self._cursor
+        self._cursor = (x, y)
+        if cur is None:
+            return self.CURSOR_MOVE(x, y)
+        cx, cy = cur
+        if cy == y:
+            if cx == x:
+                return ""
+            move = self._get_horizontal_move(cx, x)
+        elif cx == x:
+            move = self._get_vertical_move(cy, y)
+        else:
+            move = self._get_vertical_move(cy, y)
+            if move is not None:
+                hmove = self._get_horizontal_move(cx, x)
+                move = None if hmove is None else move + hmove
+        best = self.CURSOR_MOVE(x, y)
+        if move is not None and len(move) < len(best):
+            return move
+        return best
+    
+    @staticmethod
+    def _shortest(options):
+        options = [opt for opt in options if opt]
+        return min(options, key = len) if options else None
+    
+    def _get_horizontal_move(self, cx, x):
+        options = []
+        if self.COLUMN_ADDRESS:
+            options.append(self.COLUMN_ADDRESS(x))
+        if x == 0:
+            options.append("\r")
+        elif x > cx:
+            n = x - cx
+            if self.PARM_RIGHT:
+                options.append(self.PARM_RIGHT(n))
+            options.append(self.CURSOR_RIGHT * n)
+        else:
+            n = cx - x
+            if self.PARM_LEFT:
+                options.append(self.PARM_LEFT(n))
+            options.append(self.CURSOR_LEFT * n)
+            if self.PARM_RIGHT:
+                options.append("\r" + self.PARM_RIGHT(x))
+            options.append("\r" + self.CURSOR_RIGHT * x if self.CURSOR_RIGHT else "")
+        return self._shortest(options)
+    
+    def _get_vertical_move(self, cy, y):
+        options = []
+        if self.ROW_ADDRESS:
+            options.append(self.ROW_ADDRESS(y))
+        if y > cy:
+            if self.PARM_DOWN:
+                options.append(self.PARM_DOWN(y - cy))
+            options.append(self.CURSOR_DOWN * (y - cy))
+        else:
+            if self.PARM_UP:
+                options.append(self.PARM_UP(cy - y))
+            options.append(self.CURSOR_UP * (cy - y))
+        return self._shortest(options)
+    
+    def _sgr_params(self, cap):
+        match = self.SGR_PATTERN.match(cap)
+        return match.group(1) if match else None
+    
+    def _get_sgr(self, from_aid, to_aid):
+        # the transitions between attribute ids are cached, so they are only computed 
+        # once per pair
+        try:
+            return self._sgr_cache[from_aid, to_aid]
+        except KeyError:
+            pass
+        new = attr_table[to_aid]
+        caps = [self.RESET_ATTRS]
+        for key, val in new.iteritems():
+            if val:
+                if type(val) is bool:
+                    caps.append(self.TEXT_ATTRS[key])
+                else:
+                    caps.append(self.TEXT_ATTRS[key][val])
+        if self._ansi_sgr:
+            caps[0] = "\x1b[0m"
+        sgr = self._merge_sgr(caps)
+        if self.MINIMAL_SGR and self._ansi_sgr:
+            delta = self._merge_sgr(self._get_sgr_delta(attr_table[from_aid], new))
+            if len(delta) < len(sgr):
+                sgr = delta
+        self._sgr_cache[from_aid, to_aid] = sgr
+        return sgr
+    
+    def _get_sgr_delta(self, old, new):
+        # turns off what is no longer set, then sets what changed
+        caps = []
+        for key in ("bold", "dim", "underlined", "blink", "inversed", "fg", "bg"):
+            if old[key] and not new[key]:
+                caps.append("\x1b[%sm" % (self.SGR_OFF[key],))
+        # normal intensity turns off both bold and dim
+        intensity_off = (old["bold"] and not new["bold"]) or (old["dim"] and not new["dim"])
+        for key, val in new.iteritems():
+            if not val:
+                continue
+            if type(val) is bool:
+                if not old[key] or (intensity_off and key in ("bold", "dim")):
+                    caps.append(self.TEXT_ATTRS[key])
+            elif val != old[key]:
+                caps.append(self.TEXT_ATTRS[key][val])
+        return caps
+    
+    def _merge_sgr(self, caps):
+        # merges consecutive SGR sequences into one (e.g., "\x1b[1m\x1b[31m" into 
+        # "\x1b[1;31m")
+        output = []
+        params = []
+        for cap in caps:
+            if not cap:
+                continue
+            p = self._sgr_params(cap)
+            if p is None:
+                if params:
+                    output.append("\x1b[%sm" % (";".join(params),))
+                    params = []
+                output.append(cap)
+            elif p:
+                params.append(p)
+            else:
+                params.append("0")
+        if params:
+            output.append("\x1b[%sm" % (";".join(params),))
+        return "".join(output)
+
+    def scroll(self, top, bottom, count):
+        # moves the lines top..bottom up by count lines (down if count is negative),
+        # exposing blank lines; returns False if the terminal can't do that
+        n = abs(count)
+        if not self.can_scroll or n == 0 or n > bottom - top:
+            return False
+        caps = []
+        if self._attr_id != 0:
+            # exposed lines are filled with the current background
+            caps.append(self._get_sgr(self._attr_id, 0))
+            self._attr_id = 0
+        if self._scroll_with_region:
+            caps.append(self.SCROLL_REGION(top, bottom))
+            if count > 0:
+                caps.append(self.CURSOR_MOVE(0, bottom))
+                if self.PARM_SCROLL_FORWARD and (n > 1 or not self.SCROLL_FORWARD):
+                    caps.append(self.PARM_SCROLL_FORWARD(n))
+                else:
+                    caps.append(self.SCROLL_FORWARD * n)
+            else:
+                caps.append(self.CURSOR_MOVE(0, top))
+                if self.PARM_SCROLL_REVERSE and (n > 1 or not self.SCROLL_REVERSE):
+                    caps.append(self.PARM_SCROLL_REVERSE(n))
+                else:
+                    caps.append(self.SCROLL_REVERSE * n)
+            caps.append(self.SCROLL_REGION(0, self._height - 1))
+        else:
+            # delete lines at one end of the block and insert as many at the other,
+            # so the lines below the block stay in place
+            if count > 0:
+                first, second = top, bottom - n + 1
+            else:
+                first, second = bottom - n + 1, top
+            caps.extend([self.CURSOR_MOVE(0, first), self.DELETE_LINES(n), 
+                self.CURSOR_MOVE(0, second), self.INSERT_LINES(n)])
+        self._segments.append("".join(caps))
+        # setting the scroll region homes the cursor on some terminals
+        self._cursor = None
+        return True
 
     def commit(self):
-        if self._buffer:
-            self._write(self._buffer)
-            self._buffer = ""
+        count = self.bytes_written
+        if self._segments:
+            if self.sync_output:
+                self._segments.insert(0, self.SYNC_BEGIN)
+                self._segments.append(self.SYNC_END)
+            # the frame goes out in a single write, unless the tty takes it partially
+            self._write("".join(self._segments))
+            del self._segments[:]
+        self.frame_bytes = self.bytes_written - count
 
+    def is_backlogged(self):
+        if self.output_backlog > self.MAX_OUTPUT_BACKLOG:
+            self._was_backlogged = True
+        return self._was_backlogged
+    
     def reset_attrs(self):
-        self._attrs = dict(fg = None, bg = None, underlined = False,
-            bold = False, blink = False, inversed = False, dim = False)
+        self._attr_id = 0
         self._write(self.RESET_ATTRS)
     
     def get_root_canvas(self):
-        return RootCanvas(self, self._width, self._height)
+        return create_root_canvas(self, self._width, self._height, self._use_numpy_canvas)
 
 
 
@@ -0,0 +1,262 @@
+#
+# compiles parameterized terminfo strings (e.g., cup, "\E[%i%p1%d;%p2%dH") into
+# python functions, so formatting a capability doesn't go through curses.tparm.
+# the stack language is evaluated symbolically at compile time: pushes become
+# python expressions, output directives become parts of a concatenation, and
+# %? ... %t ... %e ... %; conditionals become conditional expressions. templates
+# using what can't be expressed this way (the %P/%g variables, %l) fall back to
+# a memoized tparm
+#
+import re
+import curses
+
+
+class CompileError(ValueError):
+    pass
+
+
+MAX_PARAMS = 9
+# flags have to be prefixed by a colon, so "%-" remains the subtraction operator
+FORMAT_PATTERN = re.compile(r"%(?::([-+# ]+))?(0?\d*(?:\.\d+)?[doxXs])")
+BINARY_OPS = {
+    "+" : "(%s + %s)",
+    "-" : "(%s - %s)",
+    "*" : "(%s * %s)",
+    "/" : "(%s // %s)",
+    "m" : "(%s %% %s)",
+    "&" : "(%s & %s)",
+    "|" : "(%s | %s)",
+    "^" : "(%s ^ %s)",
+    "=" : "int(%s == %s)",
+    ">" : "int(%s > %s)",
+    "<" : "int(%s < %s)",
+    "A" : "int(bool(%s) and bool(%s))",
+    "O" : "int(bool(%s) or bool(%s))",
+}
+UNARY_OPS = {
+    "!" : "int(not %s)",
+    "~" : "(~%s)",
+}
+
+
+class _Compiler(object):
+    __slots__ = ["template", "pos", "params", "used"]
+
+    def __init__(self, template):
+        self.template = template
+        self.pos = 0
+        self.params = ["p%d" % (i,) for i in range(1, MAX_PARAMS + 1)]
+        self.used = 0
+
+    def compile(self):
+        parts, stack, end = self._parse_seq([])
+        if end is not None:
+            raise CompileError("unexpected %%%s" % (end,))
+        # only the parameters that are used are named, which keeps calls cheap
+        args = ["p%d = 0" % (i,) for i in range(1, self.used + 1)] + ["*_"]
+        args = ", ".join(args)
+        return "lambda %s: %s" % (args, self._join(parts))
+
+    @staticmethod
+    def _join(parts):
+        # parts are literals, ("%d", expr) directives and ("", expr) string expressions;
+        # runs of literals and directives become a single string formatting
+        exprs = []
+        fmt = []
+        args = []
+        for part in parts:
+            if part.__class__ is str:
+                fmt.append(part.replace("%", "%%"))
+            elif part[0]:
+                fmt.append(part[0])
+                args.append(part[1])
+            else:
+                if fmt:
+                    exprs.append(_Compiler._format(fmt, args))
+                    fmt, args = [], []
+                exprs.append(part[1])
+        if fmt or not exprs:
+            exprs.append(_Compiler._format(fmt, args))
+        return " + ".join(exprs)
+
+    @staticmethod
+    def _format(fmt, args):
+        if not args:
+            return repr("".join(fmt).replace("%%", "%"))
+        return "(%r %% (%s,))" % ("".join(fmt), ", ".join(args))
+
+    def _pop(self, stack):
+        if not stack:
+            raise CompileError("stack underflow at %d" % (self.pos,))
+        return stack.pop()
+
+    def _parse_seq(self, stack):
+        # parses until the end of the template or a %t, %e or %; marker, which is
+        # returned along with the output parts and the resulting stack
+        parts = []
+        literal = []
+        tmpl = self.template
+        while self.pos < len(tmpl):
+            ch = tmpl[self.pos]
+            if ch != "%":
+                literal.append(ch)
+                self.pos += 1
+                continue
+            if literal:
+                parts.append("".join(literal))
+                literal = []
+            match = FORMAT_PATTERN.match(tmpl, self.pos)
+            if match:
+                self.pos = match.end()
+                fmt = (match.group(1) or "") + match.group(2)
+                parts.append(("%" + fmt, self._pop(stack)))
+                continue
+            op = tmpl[self.pos + 1:self.pos + 2]
+            self.pos += 2
+            if op == "%":
+                literal.append("%")
+            elif op == "c":
+                # like tparm, NUL is sent as \200
+                parts.append(("%c", "(%s & 255) or 128" % (self._pop(stack),)))
+            elif op == "p":
+                index = int(tmpl[self.pos]) - 1
+                self.pos += 1
+                self.used = max(self.used, index + 1)
+                stack.append(self.params[index])
+            elif op == "i":
+                self.params[0] = "(%s + 1)" % (self.params[0],)
+                self.params[1] = "(%s + 1)" % (self.params[1],)
+            elif op == "{":
+                end = tmpl.index("}", self.pos)
+                stack.append(str(int(tmpl[self.pos:end])))
+                self.pos = end + 1
+            elif op == "'":
+                stack.append(str(ord(tmpl[self.pos])))
+                self.pos += 2
+            elif op in BINARY_OPS:
+                b = self._pop(stack)
+                a = self._pop(stack)
+                stack.append(BINARY_OPS[op] % (a, b))
+            elif op in UNARY_OPS:
+                stack.append(UNARY_OPS[op] % (self._pop(stack),))
+            elif op == "?":
+                parts.append(("", self._parse_cond(stack)))
+            elif op in ("t", "e", ";"):
+                return parts, stack, op
+            else:
+                raise CompileError("unsupported operator %%%s" % (op,))
+        if literal:
+            parts.append("".join(literal))
+        return parts, stack, None
+
+    def _parse_cond(self, stack):
+        # called after %? (or after the %e of an else-if chain); consumes up to and
+        # including the closing %;
+        parts, stack2, end = self._parse_seq(list(stack))
+        if end != "t":
+            raise CompileError("expected %t")
+        cond = self._pop(stack2)
+        if parts or stack2 != stack:
+            raise CompileError("side effects in condition")
+        then_parts, then_stack, end = self._parse_seq(list(stack))
+        if then_stack != stack:
+            raise CompileError("side effects in conditional branch")
+        if end == ";":
+            else_expr = "''"
+        elif end == "e":
+            # the else part may itself be a condition (%e c %t ...), sharing our %;
+            pos = self.pos
+            else_parts, else_stack, end = self._parse_seq(list(stack))
+            if end == "t":
+                self.pos = pos
+                else_expr = self._parse_cond(stack)
+                end = ";"
+            elif end != ";" or else_stack != stack:
+                raise CompileError("malformed conditional")
+            else:
+                else_expr = self._join(else_parts)
+        else:
+            raise CompileError("unterminated conditional")
+        then_expr = self._join(then_parts)
+        return "(%s if %s else %s)" % (then_expr, cond, else_expr)
+
+
+def compile_cap(template):
+    """Compiles a terminfo string into a function taking up to 9 integer parameters
+    (like curses.tparm); raises CompileError if the template can't be compiled"""
+    return eval(_Compiler(template).compile(), {})
+
+def _memoized_tparm(template):
+    cache = {}
+    def tparm(*args):
+        try:
+            return cache[args]
+        except KeyError:
+            res = cache[args] = curses.tparm(template, *args)
+            return res
+    return tparm
+
+def get_formatter(template):
+    try:
+        return compile_cap(template)
+    except CompileError:
+        return _memoized_tparm(template)
+
+
+if __name__ == "__main__":
+    # validates the compiled formatters against tparm for common terminal types.
+    # curses can only be set up once per process, so each type runs in a child:
+    #
+    #   python terminfo.py [termtype]
+    #
+    import sys
+    import itertools
+    import subprocess
+
+    TERMTYPES = ["xterm", "xterm-256color", "screen", "screen-256color", "tmux-256color",
+        "linux", "rxvt", "rxvt-unicode", "vt100", "vt220", "ansi", "putty", "konsole"]
+    CAPS = {
+        "cup" : 2, "csr" : 2, "setaf" : 1, "setab" : 1, "setf" : 1, "setb" : 1,
+        "indn" : 1, "rin" : 1, "dl" : 1, "il" : 1, "hpa" : 1, "vpa" : 1,
+        "cuf" : 1, "cub" : 1, "cud" : 1, "cuu" : 1, "ech" : 1, "rep" : 2,
+    }
+    VALUES = range(0, 20) + [79, 80, 99, 100, 101, 199, 255, 999, 1000, 1001]
+
+    def validate(termtype):
+        try:
+            curses.setupterm(termtype, sys.stdout.fileno())
+        except curses.error:
+            print "%-16s not installed" % (termtype,)
+            return True
+        ok = True
+        compiled = fallback = 0
+        for cap, nparams in sorted(CAPS.items()):
+            template = re.sub(r'\$<\d+>[/*]?', '', curses.tigetstr(cap) or "")
+            if not template:
+                continue
+            try:
+                func = compile_cap(template)
+            except CompileError, ex:
+                print "%-16s %-6s falls back to tparm (%s): %r" % (termtype, cap, ex, template)
+                fallback += 1
+                continue
+            compiled += 1
+            if cap == "rep":
+                values = [(ord(c), n) for c in "ab -" for n in (1, 2, 80)]
+            else:
+                values = itertools.product(VALUES, repeat = nparams)
+            for args in values:
+                expected = curses.tparm(template, *args)
+                actual = func(*args)
+                if actual != expected:
+                    print "%-16s %-6s%r: %r != %r" % (termtype, cap, args, actual, expected)
+                    ok = False
+                    break
+        print "%-16s %d compiled, %d fall back" % (termtype, compiled, fallback)
+        return ok
+
+    if len(sys.argv) > 1:
+        sys.exit(0 if validate(sys.argv[1]) else 1)
+    failed = [termtype for termtype in TERMTYPES 
+        if subprocess.call([sys.executable, __file__, termtype])]
+    print "FAILED: %s" % (", ".join(failed),) if failed else "OK"
@@ -0,0 +1,185 @@
+#
+# compares the frame time, memory footprint, buffer allocations and output
+# bytes of the cell grid used by RootCanvas (with and without double
+# buffering, and the numpy-backed variant when numpy is installed) against
+# the old list-of-lists of (char, attrs) tuples, and the bytes written with
+# minimal attribute transitions against resetting and re-applying them.
+# the terminal is driven through a pseudo-terminal, so no real tty is needed:
+#
+#   python bench_canvas.py [width height [frames]]
+#
+import os
+import sys
+import pty
+import time
+import fcntl
+import struct
+import termios
+import threading
+os.environ.setdefault("LANG", "C.UTF-8")
+import conso
+from conso.canvas import RootCanvas, NumpyRootCanvas, numpy
+
+
+class ListRootCanvas(RootCanvas):
+    # the original representation, kept here for comparison
+    EMPTY_CHAR = (" ", {})
+
+    def __init__(self, term, width, height):
+        self.term = term
+        self.width = width
+        self.height = height
+        self.new_buffer = self._get_empty_buffer()
+        self.old_buffer = self._get_empty_buffer()
+
+    def _get_empty_buffer(self):
+        return [[self.EMPTY_CHAR] * self.width for i in range(self.height)]
+
+    def commit(self):
+        for y in range(self.height):
+            for x in range(self.width):
+                new = self.new_buffer[y][x]
+                old = self.old_buffer[y][x]
+                if new != old:
+                    ch, attrs = new
+                    self.term.write(x, y, ch, attrs)
+        self.term.commit()
+        self.old_buffer = self.new_buffer
+        self.new_buffer = self._get_empty_buffer()
+
+    def write(self, x, y, text, **attrs):
+        if y < 0 or y >= self.height:
+            return
+        for ch in text:
+            if x < 0:
+                x += 1
+                continue
+            if x >= self.width:
+                break
+            self.new_buffer[y][x] = (ch, attrs)
+            x += 1
+
+
+class PtyTerminal(object):
+    def __init__(self, width, height):
+        self.master, self.slave = pty.openpty()
+        fcntl.ioctl(self.slave, termios.TIOCSWINSZ, struct.pack("HHHH", height, width, 0, 0))
+        self.received = 0
+        self.term = conso.Terminal(self.slave, termtype = "xterm-256color")
+        thd = threading.Thread(target = self._drain)
+        thd.daemon = True
+        thd.start()
+
+    def _drain(self):
+        while True:
+            try:
+                data = os.read(self.master, 65536)
+            except OSError:
+                break
+            if not data:
+                break
+            self.received += len(data)
+
+    def __enter__(self):
+        self.term.setup()
+        return self.term
+    def __exit__(self, t, v, tb):
+        self.term.restore()
+        os.close(self.slave)
+        os.close(self.master)
+
+
+def deep_sizeof(obj, seen = None):
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.iteritems())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, name), seen) for name in obj.__slots__
+            if hasattr(obj, name))
+    return size
+
+
+def render_frame(canvas, i):
+    # a trace-view-like screen: a border, a body of lines and a status line
+    w, h = canvas.width, canvas.height
+    canvas.draw_border(fg = "cyan")
+    for y in range(1, h - 2):
+        text = ("%06d  trace line " % (i + y,)) * (w // 20)
+        canvas.write(1, y, text[:w-2], fg = "white" if y % 2 else "yellow",
+            inversed = (y == 1 + i % (h - 3)))
+    canvas.write(1, h - 2, "frame %d" % (i,), fg = "red", bold = True)
+
+def render_attrs(canvas, i):
+    # bold, inversed text whose foreground keeps changing
+    colors = ["red", "green", "yellow", "blue"]
+    for y in range(canvas.height):
+        for x in range(0, canvas.width, 4):
+            canvas.write(x, y, "%03d " % ((x * y + i) % 1000,), fg = colors[(x // 4 + i) % 4], 
+                bold = True, inversed = True)
+
+def render_status(canvas, i):
+    # a mostly static screen, where only a status line is drawn
+    canvas.write(1, canvas.height - 2, "frame %d" % (i,), fg = "red", bold = True)
+
+
+def bench(factory, render, term, width, height, frames, minimal_sgr = True):
+    term.MINIMAL_SGR = minimal_sgr
+    term._sgr_cache.clear()
+    canvas = factory(term, width, height)
+    render_frame(canvas, 0)
+    memory = deep_sizeof(canvas.new_buffer)
+    canvas.commit()
+    render(canvas, 0)
+    canvas.commit()
+    allocations = [0]
+    orig_get_empty_buffer = canvas._get_empty_buffer
+    def counting_get_empty_buffer():
+        allocations[0] += 1
+        return orig_get_empty_buffer()
+    canvas._get_empty_buffer = counting_get_empty_buffer
+    output = 0
+    t0 = time.time()
+    for i in range(frames):
+        render(canvas, i)
+        canvas.commit()
+        output += term.frame_bytes
+    t1 = time.time()
+    return (t1 - t0) / frames, memory, allocations[0] / float(frames), output // frames
+
+
+SCENARIOS = [
+    ("list of tuples", ListRootCanvas, True),
+    ("grid", lambda term, w, h: RootCanvas(term, w, h, double_buffered = False), True),
+    ("grid, double", lambda term, w, h: RootCanvas(term, w, h, double_buffered = True), True),
+    ("grid, reset sgr", RootCanvas, False),
+]
+if numpy is not None:
+    SCENARIOS.append(("numpy", NumpyRootCanvas, True))
+
+WORKLOADS = [
+    ("full repaint", render_frame),
+    ("attribute changes", render_attrs),
+    ("status line only", render_status),
+]
+
+def main(width = 400, height = 120, frames = 20):
+    for workload, render in WORKLOADS:
+        with PtyTerminal(width, height) as term:
+            results = [(name, bench(factory, render, term, width, height, frames, minimal_sgr))
+                for name, factory, minimal_sgr in SCENARIOS]
+        print "%s, %dx%d, %d frames" % (workload, width, height, frames)
+        for name, (frame_time, memory, allocs, output) in results:
+            print "  %-16s %8.2f ms/frame  %8d bytes written/frame  %10d bytes/buffer  " \
+                "%5.2f buffers allocated/frame (%d bytes)" % (name, frame_time * 1000, output,
+                memory, allocs, allocs * memory)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,166 @@
+#
+# compares the throughput of the table-driven KeysDecoder against the KeysTrie it
+# replaced, on pasted text, keyboard navigation, mouse drags and random input, and
+# checks that both produce the same events for the same input, whichever way it's
+# split into chunks. the trie only knows the X10 mouse encoding, so SGR drags are
+# compared with the same drags in X10:
+#
+#   python bench_decoder.py [kbytes-per-workload]
+#
+import sys
+import time
+import random
+from conso.events import KeysTrie, KeysDecoder, sequences, parameterized_sequences
+from conso.events import MouseEvent, MOTION
+
+
+def make_paste(size):
+    words = ["trace", "line", "hello", "world", "0x7ffe", "def", "return", "(self)"]
+    text = []
+    total = 0
+    while total < size:
+        text.append(random.choice(words))
+        text.append("\r" if random.random() < 0.1 else " ")
+        total += len(text[-2]) + 1
+    return u"".join(text)[:size]
+
+def make_keys(size):
+    keys = [seq for seq, info in sequences.items() if not callable(info)]
+    keys += list(u"abcdefghij")
+    out = []
+    total = 0
+    while total < size:
+        out.append(random.choice(keys))
+        total += len(out[-1])
+    return u"".join(out)
+
+def make_mouse(size, sgr = False):
+    # presses, drags (motion with button 1 held) and releases
+    out = []
+    for i in xrange(size // 6):
+        b = random.choice([0, 32, 32, 32, 35])
+        x = random.randrange(200)
+        y = random.randrange(60)
+        if sgr:
+            out.append(u"\x1b[<%d;%d;%d%s" % (b & ~3 if b == 35 else b, x + 1, y + 1, 
+                "m" if b == 35 else "M"))
+        else:
+            out.append(u"\x1b[M%s%s%s" % (unichr(32 + b), unichr(33 + x), unichr(33 + y)))
+    return u"".join(out)
+
+def make_sgr_mouse(size):
+    return make_mouse(size, sgr = True)
+
+def make_random(size):
+    alphabet = u"\x1b\x1b\x1b[[[O;~123456789ABCDPQRSxyz\x7f\x03\r\t "
+    return u"".join(random.choice(alphabet) for i in xrange(size))
+
+
+def split(data, chunk):
+    if not chunk:
+        return [data]
+    chunks = []
+    i = 0
+    while i < len(data):
+        n = random.randint(1, chunk)
+        chunks.append(data[i:i + n])
+        i += n
+    return chunks
+
+def coalesce_motion(events):
+    # what the decoder does with the events of a read
+    out = []
+    for evt in events:
+        prev = out[-1] if out else None
+        if evt.__class__ is MouseEvent and prev.__class__ is MouseEvent and \
+                evt.flags & MOTION and prev.flags == evt.flags and prev.btn == evt.btn:
+            out[-1] = evt
+        else:
+            out.append(evt)
+    return out
+
+def run_trie(trie, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(coalesce_motion(trie.decode(chunk)))
+    if trie.stack:
+        evt = trie.pull()
+        if evt:
+            events.append(evt)
+    return events
+
+def run_decoder(decoder, chunks):
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.decode(chunk))
+    evt = decoder.pull()
+    if evt:
+        events.append(evt)
+    return events
+
+
+def check(factory, trie_factory, size = 20000):
+    random.seed(3)
+    data = factory(size)
+    random.seed(3)
+    trie_data = trie_factory(size)
+    # motion events are only collapsed within a read, so inputs of different 
+    # lengths are only compared in a single chunk
+    for chunk in (0, 1, 3, 17, 500) if data == trie_data else (0,):
+        random.seed(chunk)
+        expected = run_trie(KeysTrie(sequences), split(trie_data, chunk))
+        random.seed(chunk)
+        actual = run_decoder(KeysDecoder(sequences, parameterized_sequences), split(data, chunk))
+        if map(repr, expected) != map(repr, actual):
+            for i, (e, a) in enumerate(zip(expected, actual)):
+                if repr(e) != repr(a):
+                    break
+            print "  MISMATCH (chunks of up to %d) at event %d: %r != %r" % (chunk, i, e, a)
+            return False
+    return True
+
+def bench(run, decoder, chunks, rounds = 3):
+    best = None
+    for i in range(rounds):
+        decoder.reset()
+        t0 = time.time()
+        events = run(decoder, chunks)
+        t = time.time() - t0
+        best = t if best is None else min(best, t)
+    return best, len(events)
+
+
+# (name, input factory, the trie's input factory)
+WORKLOADS = [
+    ("pasted text", make_paste, make_paste),
+    ("keyboard", make_keys, make_keys),
+    ("mouse drag", make_mouse, make_mouse),
+    ("sgr drag", make_sgr_mouse, make_mouse),
+    ("random", make_random, make_random),
+]
+
+def main(kbytes = 200):
+    size = kbytes * 1000
+    ok = True
+    for name, factory, trie_factory in WORKLOADS:
+        random.seed(1)
+        data = factory(size)
+        random.seed(1)
+        trie_data = data if trie_factory is factory else trie_factory(size)
+        # reads come in chunks of up to 500 characters (see Terminal._read_all)
+        random.seed(2)
+        trie_time, trie_count = bench(run_trie, KeysTrie(sequences), split(trie_data, 500))
+        random.seed(2)
+        dec_time, count = bench(run_decoder, KeysDecoder(sequences, parameterized_sequences), 
+            split(data, 500))
+        print "%-12s %8d chars   trie %7.1f ms (%5.2f MB/s) %7d events   decoder %7.1f ms " \
+            "(%5.2f MB/s) %7d events   x%.1f" % (name, len(data), trie_time * 1000,
+            len(trie_data) / trie_time / 1e6, trie_count, dec_time * 1000, 
+            len(data) / dec_time / 1e6, count, trie_time / dec_time)
+        if not check(factory, trie_factory):
+            ok = False
+    print "same events: %s" % ("OK" if ok else "FAILED",)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,99 @@
+#
+# drives the terminal through a pseudo-terminal whose other end reads slowly (like
+# a terminal behind a slow link), rendering frames as fast as possible, with
+# blocking and with non-blocking output. with non-blocking output, commits must
+# not stall and frames are dropped while the terminal is behind; the last frame
+# still makes it to the terminal:
+#
+#   python slow_pty.py [bytes-per-second [frames]]
+#
+import os
+import sys
+import pty
+import time
+import fcntl
+import struct
+import termios
+import threading
+os.environ.setdefault("LANG", "C.UTF-8")
+import conso
+from conso.events import OutputDrainedEvent
+
+
+class SlowPty(object):
+    def __init__(self, width, height, rate):
+        self.master, self.slave = pty.openpty()
+        fcntl.ioctl(self.slave, termios.TIOCSWINSZ, struct.pack("HHHH", height, width, 0, 0))
+        self.rate = rate
+        self.received = []
+        thd = threading.Thread(target = self._drain)
+        thd.daemon = True
+        thd.start()
+
+    def _drain(self):
+        chunk = 1024
+        while True:
+            try:
+                data = os.read(self.master, chunk)
+            except OSError:
+                break
+            if not data:
+                break
+            self.received.append(data)
+            time.sleep(len(data) / float(self.rate))
+
+    def close(self):
+        os.close(self.slave)
+        os.close(self.master)
+
+
+# drawn on a line that's blank in the other frames, so it's sent as is
+LAST_FRAME = "***LAST-FRAME***"
+
+def render(canvas, i, last = False):
+    for y in range(canvas.height - 1):
+        canvas.write(0, y, ("frame %d line %d " % (i, y)) * 10, fg = "green" if y % 2 else None)
+    if last:
+        canvas.write(0, canvas.height - 1, LAST_FRAME)
+
+
+def run(nonblocking, rate, frames, width = 80, height = 24):
+    pty_ = SlowPty(width, height, rate)
+    term = conso.Terminal(pty_.slave, termtype = "xterm-256color",
+        nonblocking_output = nonblocking)
+    term.setup()
+    canvas = term.get_root_canvas()
+    committed = 0
+    worst = 0
+    t0 = time.time()
+    for i in range(frames):
+        render(canvas, i, last = (i == frames - 1))
+        t = time.time()
+        if canvas.commit() is not False:
+            committed += 1
+        worst = max(worst, time.time() - t)
+        # what the main loop would do between frames
+        while term.get_event(0, 0) is OutputDrainedEvent:
+            if canvas.commit_held():
+                committed += 1
+    elapsed = time.time() - t0
+    # let the output drain, so the last frame gets out
+    while canvas.held_buffer is not None or term.output_backlog:
+        if term.get_event(1, 0) is OutputDrainedEvent:
+            canvas.commit_held()
+    term.restore()
+    time.sleep(0.5)
+    pty_.close()
+    data = "".join(pty_.received)
+    print "%-12s %4d/%d frames sent, render loop %6.2fs, slowest commit %6.1f ms, %7d bytes, " \
+        "last frame shown: %s" % ("non-blocking" if nonblocking else "blocking", committed,
+        frames, elapsed, worst * 1000, len(data), LAST_FRAME in data)
+
+
+def main(rate = 100000, frames = 100):
+    for nonblocking in (False, True):
+        run(nonblocking, rate, frames)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
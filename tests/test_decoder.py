@@ -0,0 +1,118 @@
+#
+# checks that KeysDecoder turns SGR (1006) mouse reports into the right events,
+# including the wheel and the extra buttons, and whichever way a report is split
+# across reads, and that incomplete sequences are released when the input is 
+# taken to be complete (after the character completion timeout):
+#
+#   python test_decoder.py
+#
+from conso.events import KeysDecoder, sequences, parameterized_sequences
+from conso.events import KeyEvent, MouseEvent, PasteEvent, InvalidKeyEvent
+from conso.events import SHIFT, ALT, CTRL, MOTION
+
+
+def decode(*chunks):
+    decoder = KeysDecoder(sequences, parameterized_sequences)
+    events = []
+    for chunk in chunks:
+        events.extend(decoder.decode(chunk))
+    assert not decoder.pending
+    return events
+
+def check_sgr(report, x, y, btn, flags = 0):
+    for i in range(len(report) + 1):
+        events = decode(report[:i], report[i:])
+        assert len(events) == 1, (report, i, events)
+        evt = events[0]
+        assert isinstance(evt, MouseEvent)
+        assert (evt.x, evt.y, evt.btn, evt.flags) == (x, y, btn, flags), (report, evt)
+
+def test_sgr_buttons():
+    check_sgr(u"\x1b[<0;1;1M", 0, 0, MouseEvent.BTN1)
+    check_sgr(u"\x1b[<1;10;5M", 9, 4, MouseEvent.BTN2)
+    check_sgr(u"\x1b[<2;300;200M", 299, 199, MouseEvent.BTN3)
+    check_sgr(u"\x1b[<0;7;3m", 6, 2, MouseEvent.BTN_RELEASE)
+
+def test_sgr_modifiers():
+    check_sgr(u"\x1b[<4;1;1M", 0, 0, MouseEvent.BTN1, SHIFT)
+    check_sgr(u"\x1b[<24;1;1M", 0, 0, MouseEvent.BTN1, ALT | CTRL)
+    check_sgr(u"\x1b[<32;5;5M", 4, 4, MouseEvent.BTN1, MOTION)
+    check_sgr(u"\x1b[<44;5;5M", 4, 4, MouseEvent.BTN1, SHIFT | ALT | MOTION)
+
+def test_sgr_wheel():
+    check_sgr(u"\x1b[<64;2;2M", 1, 1, MouseEvent.BTN4)
+    check_sgr(u"\x1b[<65;2;2M", 1, 1, MouseEvent.BTN5)
+    check_sgr(u"\x1b[<66;2;2M", 1, 1, MouseEvent.BTN6)
+    check_sgr(u"\x1b[<67;2;2M", 1, 1, MouseEvent.BTN7)
+    check_sgr(u"\x1b[<80;2;2M", 1, 1, MouseEvent.BTN4, CTRL)
+
+def test_sgr_extra_buttons():
+    check_sgr(u"\x1b[<128;3;3M", 2, 2, MouseEvent.BTN8)
+    check_sgr(u"\x1b[<129;3;3M", 2, 2, MouseEvent.BTN9)
+    check_sgr(u"\x1b[<130;3;3M", 2, 2, MouseEvent.BTN10)
+    check_sgr(u"\x1b[<131;3;3M", 2, 2, MouseEvent.BTN11)
+    check_sgr(u"\x1b[<160;3;3M", 2, 2, MouseEvent.BTN8, MOTION)
+    check_sgr(u"\x1b[<128;3;3m", 2, 2, MouseEvent.BTN_RELEASE)
+
+def test_sgr_unknown_buttons():
+    check_sgr(u"\x1b[<192;4;4M", 3, 3, MouseEvent.BTN_UNKNOWN)
+    check_sgr(u"\x1b[<256;4;4M", 3, 3, MouseEvent.BTN_UNKNOWN)
+    check_sgr(u"\x1b[<195;4;4M", 3, 3, MouseEvent.BTN_UNKNOWN)
+
+def test_sgr_motion_coalescing():
+    events = decode(u"\x1b[<32;1;1M\x1b[<32;2;1M\x1b[<32;3;1M\x1b[<0;3;1m")
+    assert [(evt.x, evt.btn) for evt in events] == [(2, MouseEvent.BTN1),
+        (2, MouseEvent.BTN_RELEASE)], events
+
+def test_paste():
+    for i in range(len(u"\x1b[200~a\rb\x1b[201~") + 1):
+        data = u"\x1b[200~a\rb\x1b[201~x"
+        events = decode(data[:i], data[i:])
+        assert map(repr, events) == map(repr, [PasteEvent(u"a\rb"), KeyEvent(u"x")]), events
+
+def test_pull():
+    for data, expected in [
+            (u"\x1b", KeyEvent.from_string("esc")),
+            (u"\x1b[1;", InvalidKeyEvent),
+            (u"\x1b[<0;5", InvalidKeyEvent),
+            (u"\x1b[M!", InvalidKeyEvent)]:
+        decoder = KeysDecoder(sequences, parameterized_sequences)
+        assert decoder.decode(data) == [], data
+        assert decoder.pending, data
+        assert repr(decoder.pull()) == repr(expected), data
+        assert not decoder.pending
+        assert decoder.pull() is None
+        # keys that follow are decoded again
+        assert decoder.decode(u"q") == [KeyEvent(u"q")], data
+
+def test_stalled_paste():
+    # the part that arrived before the stall is delivered, and the rest is still 
+    # pasted text, up to the end marker, whichever way the rest is split
+    rest = u"line2\rrm -rf x\r\x1b[201~q"
+    for head, first in [(u"\x1b[200~", None), (u"\x1b[200~part1", u"part1")]:
+        for i in range(len(rest) + 1):
+            decoder = KeysDecoder(sequences, parameterized_sequences)
+            assert decoder.decode(head) == []
+            assert repr(decoder.pull()) == repr(first and PasteEvent(first)), head
+            events = decoder.decode(rest[:i])
+            assert decoder.pull() is None
+            events += decoder.decode(rest[i:])
+            assert all(isinstance(evt, PasteEvent) for evt in events[:-1]), events
+            assert u"".join(evt.text for evt in events[:-1]) == u"line2\rrm -rf x\r", events
+            assert events[-1] == KeyEvent(u"q"), events
+            assert not decoder.in_paste and not decoder.pending
+
+def test_stalled_paste_end():
+    # a cut off end marker keeps waiting for the rest of it
+    decoder = KeysDecoder(sequences, parameterized_sequences)
+    assert decoder.decode(u"\x1b[200~abc\x1b[20") == []
+    assert repr(decoder.pull()) == repr(PasteEvent(u"abc"))
+    assert decoder.pull() is None
+    assert decoder.decode(u"1~q") == [KeyEvent(u"q")]
+
+
+if __name__ == "__main__":
+    for name, func in sorted(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print "%-25s OK" % (name,)
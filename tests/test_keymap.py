@@ -0,0 +1,102 @@
+#
+# checks per-instance key bindings on widgets, including fully slotted ones (which
+# have no __dict__ to hold an instance keymap) and containers, which fall back to
+# their own bindings when their body doesn't handle a key. events go through
+# on_event, as the application sends them:
+#
+#   python test_keymap.py
+#
+from conso.events import KeyEvent
+from conso.canvas import RootCanvas
+from conso.widgets import Label, Frame, StubBox, Cached, VListBox, SimpleListModel
+from conso.widgets import TextEntry
+# the exported layouts (layout3) are unfinished
+from conso.widgets.layouts.layouts import HLayout
+
+
+def handled(widget, key):
+    return widget.on_event(KeyEvent.from_string(key))
+
+def test_bind_key():
+    calls = []
+    def on_f1(widget, evt):
+        calls.append((widget, evt))
+        return True
+    for widget in (Label("x"), Frame(Label("x")), StubBox(Label("x")), Cached(Label("x"))):
+        assert not hasattr(widget, "__dict__")
+        assert not handled(widget, "f1")
+        widget.bind_key("f1", on_f1)
+        assert handled(widget, "f1")
+        assert calls[-1] == (widget, KeyEvent.from_string("f1"))
+    # other instances and the class keep the class' keymap
+    assert not handled(Label("y"), "f1")
+    assert KeyEvent.from_string("f1") not in Label._class_keymap
+
+def test_nested_bindings():
+    # the innermost widget that handles a key gets it; its containers get the rest
+    calls = []
+    def handler(name):
+        def on_key(widget, evt):
+            calls.append(name)
+            return True
+        return on_key
+    inner = Label("x")
+    inner.bind_key("f1", handler("inner"))
+    cached = Cached(inner)
+    cached.bind_key("f1", handler("cached"))
+    cached.bind_key("f2", handler("cached"))
+    frame = Frame(cached)
+    frame.bind_key("f3", handler("frame"))
+    for key in ("f1", "f2", "f3"):
+        assert handled(frame, key)
+    assert not handled(frame, "f4")
+    assert calls == ["inner", "cached", "frame"]
+
+def test_unbind_key():
+    lst = VListBox(SimpleListModel([Label("a"), Label("b")]))
+    lst.bind_key("down", None)
+    assert not handled(lst, "down")
+    assert lst.selected_index == 0
+    assert KeyEvent.from_string("down") in lst.__class__._class_keymap
+
+def test_remap_keys():
+    def on_f1(widget, evt):
+        return True
+    widget = Frame(Label("x"))
+    widget.bind_key("f1", on_f1)
+    widget.remap_keys({"f2" : "f1"})
+    assert handled(widget, "f2")
+    assert handled(widget, "f1")
+    assert not handled(Frame(Label("x")), "f2")
+
+def test_remap_unbound_key():
+    widget = Cached(Label("x"))
+    try:
+        widget.remap_keys({"f2" : "f3"})
+    except KeyError:
+        pass
+    else:
+        assert False, "expected KeyError"
+    assert not handled(widget, "f2")
+
+def test_layout_keys():
+    # the layout's own keys go through its keymap, so they can be remapped too
+    layout = HLayout(TextEntry("a"), TextEntry("b"))
+    layout.remodel(RootCanvas(None, 40, 5))
+    assert layout.selected_index == 0
+    layout.remap_keys({"f5" : "tab"})
+    assert handled(layout, "f5")
+    assert layout.selected_index == 1
+    assert not handled(layout, "f5")
+    assert handled(layout, "shift tab")
+    assert layout.selected_index == 0
+    assert handled(layout, "esc")
+    assert not layout.is_selected_focused
+    assert not handled(layout, "esc")
+
+
+if __name__ == "__main__":
+    for name, func in sorted(globals().items()):
+        if name.startswith("test_"):
+            func()
+            print "%-25s OK" % (name,)
@@ -1,6 +1,6 @@
 from .base import Widget
 from .basic import Label, LabelBox, Button, TextEntry, ProgressBar
-from .containers import Frame, StubBox, TabBox
+from .containers import Frame, StubBox, TabBox, Cached
 from .containers import HListBox, VListBox, ListModel, SimpleListModel
 from .layouts import HLayout, VLayout, Fixed, Scaled
 from .modules import Module, action, FramedModule, ListModule
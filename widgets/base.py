@@ -1,9 +1,45 @@
-from conso.events import KeyEvent, MouseEvent
+from conso.events import KeyEvent, MouseEvent, PasteEvent
+
+
+def bind(*keys):
+    """Binds the decorated method to the given keys (as in KeyEvent.from_string); 
+    it's called with the event, and returns True if it handled it"""
+    def deco(func):
+        func._bound_keys = getattr(func, "_bound_keys", ()) + keys
+        return func
+    return deco
+
+
+class WidgetMeta(type):
+    # compiles the class' keymap, mapping each bound key to its handler, once, when 
+    # the class is created. bindings are inherited, and are looked up by name, so 
+    # overriding a handler (even without binding it again) replaces it. instances
+    # share it until bind_key or remap_keys gives them their own
+    def __init__(cls, name, bases, dict):
+        type.__init__(cls, name, bases, dict)
+        names = {}
+        for klass in reversed(cls.__mro__):
+            for attrname, obj in vars(klass).iteritems():
+                for key in getattr(obj, "_bound_keys", ()):
+                    names[KeyEvent.from_string(key)] = attrname
+        keymap = {}
+        for evt, attrname in names.iteritems():
+            for klass in cls.__mro__:
+                if attrname in vars(klass):
+                    keymap[evt] = vars(klass)[attrname]
+                    break
+        cls._class_keymap = keymap
 
 
 class Widget(object):
-    __slots__ = ["canvas"]
+    __metaclass__ = WidgetMeta
+    __slots__ = ["canvas", "_keymap"]
     
+    def __new__(cls, *args, **kwargs):
+        self = object.__new__(cls)
+        self._keymap = cls._class_keymap
+        return self
+
     def is_interactive(self):
         return True
     def get_min_size(self, pwidth, pheight):
@@ -14,18 +50,58 @@ class Widget(object):
         raise NotImplementedError()
     def render(self, style, focused = False, highlight = False):
         raise NotImplementedError()
+    def get_render_key(self):
+        # a hashable snapshot of whatever the rendering depends on (besides the canvas
+        # and the render arguments), used by Cached; None means it can't be told, and 
+        # the widget must be rendered every time
+        return None
 
     def on_event(self, evt):
         if isinstance(evt, KeyEvent):
             return self._on_key(evt)
         elif isinstance(evt, MouseEvent):
             return self._on_mouse(evt)
+        elif isinstance(evt, PasteEvent):
+            return self._on_paste(evt)
         else:
             return False
     def _on_key(self, evt):
-        return False
+        return self._dispatch_key(evt)
     def _on_mouse(self, evt):
         return False
+    def _on_paste(self, evt):
+        # containers hand pastes to their selected child
+        sw = self.get_selected_widget()
+        if sw and sw.on_event(evt):
+            return True
+        return False
+    def get_selected_widget(self):
+        return None
+
+    def _dispatch_key(self, evt):
+        handler = self._keymap.get(evt)
+        if handler is None:
+            return False
+        return handler(self, evt)
+
+    def bind_key(self, key, handler):
+        """Binds a key of this instance only, overriding the class' keymap; the handler
+        is called like a method, with the widget and the event. A handler of None 
+        unbinds the key"""
+        keymap = dict(self._keymap)
+        keymap[KeyEvent.from_string(key)] = handler
+        self._keymap = keymap
+
+    def remap_keys(self, mapping):
+        """Makes this instance handle each key of mapping like the key it maps to; 
+        for instance, {"right" : "down"}"""
+        keymap = dict(self._keymap)
+        for key, target in mapping.iteritems():
+            target = KeyEvent.from_string(target)
+            if self._keymap.get(target) is None:
+                raise KeyError("%s is not bound" % (target,))
+            keymap[KeyEvent.from_string(key)] = self._keymap[target]
+        self._keymap = keymap
 
 
 
@@ -1,4 +1,4 @@
-from ..base import Widget
+from ..base import Widget, bind
 
 
 class Button(Widget):
@@ -11,17 +11,18 @@ class Button(Widget):
         return (3, 1)
     def get_desired_size(self, pwidth, pheight):
         return (len(self.text) + 2, 1)
+    def get_render_key(self):
+        return self.text
     def render(self, style, focused = False, highlight = False):
         text = u"[%s]" % (self.text[:self.canvas.width-2],)
         self.canvas.write(0, 0, text, 
             fg = style.button_text_color_focused if focused else style.button_text_color, 
             bg = style.button_bg_color, bold = True, inversed = highlight)
     
-    def _on_key(self, evt):
-        if evt == "enter" or evt == "space":
-            self.callback(self)
-            return True
-        return False
+    @bind("enter", "space")
+    def _key_press(self, evt):
+        self.callback(self)
+        return True
     
     def _on_mouse(self, evt):
         if evt.btn == evt.BTN_RELEASE:
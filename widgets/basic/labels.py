@@ -1,4 +1,4 @@
-from ..base import Widget
+from ..base import Widget, bind
 
 
 class Label(Widget):
@@ -13,6 +13,8 @@ class Label(Widget):
         return False
     def remodel(self, canvas):
         self.canvas = canvas
+    def get_render_key(self):
+        return self.text
     def render(self, style, focused = False, highlight = False):
         padded = self.text + " " * (self.canvas.width - len(self.text))
         self.canvas.write(0, 0, padded, fg = style.label_text_color, bg = style.label_bg_color,
@@ -29,38 +31,54 @@ class LabelBox(Widget):
         return (max(len(l) for l in self.lines)+2, len(self.lines))
     def remodel(self, canvas):
         self.canvas = canvas
+    def get_render_key(self):
+        return (tuple(self.lines[self.line_index:self.line_index+self.canvas.height]), 
+            self.scroll_x)
     def render(self, style, focused = False, highlight = False):
         for y, line in enumerate(self.lines[self.line_index:self.line_index+self.canvas.height]):
             text = line[self.scroll_x:self.scroll_x+self.canvas.width]
             self.canvas.write(0, y, text, fg = style.labelbox_text_color, 
                 bg = style.labelbox_bg_color)
 
-    def _on_key(self, evt):
-        if evt == "home":
-            self.scroll_x = 0
-            self.line_index = 0
-            return True
-        if evt == "end":
-            self.line_index = max(len(self.lines) - 1, 0)
-            return True
-        elif evt == "up":
-            self.line_index = max(0, self.line_index - 1)
-            return True
-        elif evt == "down":
-            self.line_index = min(len(self.lines) - 1, self.line_index + 1)
-            return True
-        elif evt == "pagedown":
-            self.line_index = min(len(self.lines) - 1, self.line_index + self.canvas.height)
-            return True
-        elif evt == "pageup":
-            self.line_index = max(0, self.line_index - self.canvas.height)
-            return True
-        elif evt == "right":
-            self.scroll_x += 1
-            return True
-        elif evt == "left":
-            self.scroll_x = max(0, self.scroll_x - 1)
-            return True
-        return False
+    @bind("home")
+    def _key_home(self, evt):
+        self.scroll_x = 0
+        self.line_index = 0
+        return True
+    
+    @bind("end")
+    def _key_end(self, evt):
+        self.line_index = max(len(self.lines) - 1, 0)
+        return True
+    
+    @bind("up")
+    def _key_up(self, evt):
+        self.line_index = max(0, self.line_index - 1)
+        return True
+    
+    @bind("down")
+    def _key_down(self, evt):
+        self.line_index = min(len(self.lines) - 1, self.line_index + 1)
+        return True
+    
+    @bind("pagedown")
+    def _key_pagedown(self, evt):
+        self.line_index = min(len(self.lines) - 1, self.line_index + self.canvas.height)
+        return True
+    
+    @bind("pageup")
+    def _key_pageup(self, evt):
+        self.line_index = max(0, self.line_index - self.canvas.height)
+        return True
+    
+    @bind("right")
+    def _key_right(self, evt):
+        self.scroll_x += 1
+        return True
+    
+    @bind("left")
+    def _key_left(self, evt):
+        self.scroll_x = max(0, self.scroll_x - 1)
+        return True
 
 
@@ -19,6 +19,8 @@ class ProgressBar(Widget):
         return False
     def remodel(self, canvas):
         self.canvas = canvas
+    def get_render_key(self):
+        return (self.percentage, self.show_percentage)
     def render(self, style, focused = False, highlight = False):
         full = int((self.percentage * self.canvas.width) / 100)
         empty = self.canvas.width - full
@@ -1,4 +1,8 @@
-from ..base import Widget
+import re
+from ..base import Widget, bind
+
+
+CONTROL_CHARS = re.compile(u"[\x00-\x1f\x7f]+")
 
 
 class TextEntry(Widget):
@@ -14,6 +18,8 @@ class TextEntry(Widget):
         return (pwidth, 1)
     def get_min_size(self, pwidth, pheight):
         return (3, 1)
+    def get_render_key(self):
+        return (self.text, self.cursor_offset, self.start_offset, self.end_offset)
     def render(self, style, focused = False, highlight = False):
         w = self.canvas.width
         
@@ -48,34 +54,9 @@ class TextEntry(Widget):
                 bg = style.textentry_bg_color, inversed = highlight)
     
     def _on_key(self, evt):
-        if evt == "left":
-            if self.cursor_offset >= 1:
-                self.cursor_offset -= 1
-            return True
-        elif evt == "right":
-            if self.cursor_offset <= len(self.text) - 1:
-                self.cursor_offset += 1
-            return True
-        elif evt == "backspace":
-            if self.cursor_offset >= 1:
-                before = self.text[:self.cursor_offset-1]
-                after = self.text[self.cursor_offset:]
-                self.cursor_offset -= 1
-                self.text = before + after
-            return True
-        elif evt == "delete":
-            if len(self.text) > self.cursor_offset:
-                before = self.text[:self.cursor_offset]
-                after = self.text[self.cursor_offset+1:]
-                self.text = before + after
-            return True
-        elif evt == "home":
-            self.cursor_offset = 0
+        if self._dispatch_key(evt):
             return True
-        elif evt == "end":
-            self.cursor_offset = len(self.text)
-            return True
-        elif not self.max_length or len(self.text) < self.max_length:
+        if not self.max_length or len(self.text) < self.max_length:
             ch = evt.as_char()
             if ch:
                 before = self.text[:self.cursor_offset]
@@ -84,6 +65,59 @@ class TextEntry(Widget):
                 self.cursor_offset += 1
                 return True
         return False
+    
+    @bind("left")
+    def _key_left(self, evt):
+        if self.cursor_offset >= 1:
+            self.cursor_offset -= 1
+        return True
+    
+    @bind("right")
+    def _key_right(self, evt):
+        if self.cursor_offset <= len(self.text) - 1:
+            self.cursor_offset += 1
+        return True
+    
+    @bind("backspace")
+    def _key_backspace(self, evt):
+        if self.cursor_offset >= 1:
+            before = self.text[:self.cursor_offset-1]
+            after = self.text[self.cursor_offset:]
+            self.cursor_offset -= 1
+            self.text = before + after
+        return True
+    
+    @bind("delete")
+    def _key_delete(self, evt):
+        if len(self.text) > self.cursor_offset:
+            before = self.text[:self.cursor_offset]
+            after = self.text[self.cursor_offset+1:]
+            self.text = before + after
+        return True
+    
+    @bind("home")
+    def _key_home(self, evt):
+        self.cursor_offset = 0
+        return True
+    
+    @bind("end")
+    def _key_end(self, evt):
+        self.cursor_offset = len(self.text)
+        return True
+
+    def _on_paste(self, evt):
+        # the pasted text is inserted at once; line breaks and other control characters 
+        # become spaces
+        text = CONTROL_CHARS.sub(u" ", evt.text)
+        if self.max_length:
+            text = text[:max(0, self.max_length - len(self.text))]
+        if not text:
+            return False
+        before = self.text[:self.cursor_offset]
+        after = self.text[self.cursor_offset:]
+        self.text = before + text + after
+        self.cursor_offset += len(text)
+        return True
 
     def _on_mouse(self, evt):
         if evt.btn == evt.BTN_RELEASE:
@@ -1,5 +1,6 @@
 from .frames import Frame, StubBox
 from .listbox import ListBox, ListModel, SimpleListModel, HListBox, VListBox
 from .tabs import TabBox, TabInfo
+from .cached import Cached
 
 
@@ -0,0 +1,48 @@
+from ..base import Widget
+
+
+class Cached(Widget):
+    # renders the body into an offscreen block, which is merely blitted for as long as
+    # the body's render key, the style and the render arguments stay the same.
+    # the block is dropped when the body is remodelled or handles an event
+    __slots__ = ["body", "surface", "_key"]
+    def __init__(self, body):
+        self.body = body
+        self.surface = None
+        self._key = None
+    def is_interactive(self):
+        return self.body.is_interactive()
+    def get_min_size(self, pwidth, pheight):
+        return self.body.get_min_size(pwidth, pheight)
+    def get_desired_size(self, pwidth, pheight):
+        return self.body.get_desired_size(pwidth, pheight)
+    def get_priority(self):
+        return self.body.get_priority()
+    def get_render_key(self):
+        return self.body.get_render_key()
+    def invalidate(self):
+        self._key = None
+    def remodel(self, canvas):
+        self.canvas = canvas
+        # the surface (and its grid) is only rebuilt when the size changes
+        if self.surface is None or self.surface.width != canvas.width or \
+                self.surface.height != canvas.height:
+            self.surface = canvas.scrolled_subcanvas(canvas.width, canvas.height)
+        else:
+            self.surface.attach(canvas)
+        self.body.remodel(self.surface)
+        self._key = None
+    def render(self, style, focused = False, highlight = False):
+        key = self.body.get_render_key()
+        if key is not None:
+            key = (style, style.version, focused, highlight, key)
+        if key is None or key != self._key:
+            self.surface.clear()
+            self.body.render(style, focused = focused, highlight = highlight)
+            self._key = key
+        self.surface.blit_view()
+    def on_event(self, evt):
+        if self.body.on_event(evt):
+            self._key = None
+            return True
+        return self._dispatch_key(evt)
@@ -19,6 +19,11 @@ class Frame(Widget):
     def remodel(self, canvas):
         self.canvas = canvas
         self.body.remodel(canvas.subcanvas(1, 1, canvas.width-2, canvas.height-2))
+    def get_render_key(self):
+        key = self.body.get_render_key()
+        if key is None:
+            return None
+        return (self.title, key)
     def render(self, style, focused = False, highlight = False):
         self.canvas.draw_border(
             fg = style.frame_border_color_focused if focused else style.frame_border_color)
@@ -26,7 +31,9 @@ class Frame(Widget):
             fg = style.frame_title_color_focused if focused else style.frame_title_color)
         self.body.render(style, focused = focused)
     def on_event(self, evt):
-        return self.body.on_event(evt)
+        if self.body.on_event(evt):
+            return True
+        return self._dispatch_key(evt)
 
 
 class StubBox(Widget):
@@ -58,15 +65,18 @@ class StubBox(Widget):
         if not self.body:
             return
         self.body.remodel(canvas)
+    def get_render_key(self):
+        if not self.body:
+            return ()
+        return self.body.get_render_key()
     def render(self, style, focused = False, highlight = False):
         if not self.body:
             return
         self.body.render(style, focused = focused, highlight = highlight)
     def on_event(self, evt):
-        if self.body:
-            return self.body.on_event(evt)
-        else:
-            return False
+        if self.body and self.body.on_event(evt):
+            return True
+        return self._dispatch_key(evt)
 
 
 
@@ -1,18 +1,21 @@
-from ..base import Widget
+from ..base import Widget, bind
 from ..basic import Label
 
 
 class ListModel(object):
     __slots__ = []
+    # bumped by models on every change; None means the model can't tell
+    version = None
     def hasitem(self, index):
         raise NotImplementedError()
     def getitem(self, index):
         raise NotImplementedError()
 
 class SimpleListModel(ListModel):
-    __slots__ = ["list"]
+    __slots__ = ["list", "version"]
     def __init__(self, seq):
         self.list = list(seq)
+        self.version = 0
     def hasitem(self, index):
         return index >= 0 and index < len(self.list)
     def getitem(self, index):
@@ -23,20 +26,28 @@ class SimpleListModel(ListModel):
     
     def append(self, item):
         self.list.append(item)
+        self.version += 1
     def insert(self, index, item):
         self.list.insert(index, item)
+        self.version += 1
     def pop(self, index = -1):
         self.list.pop(index)
+        self.version += 1
     def __getitem__(self, index):
         return self.list[index]
     def __delitem__(self, index):
         del self.list[index]
+        self.version += 1
     def __setitem__(self, index, item):
         self.list[index] = item
+        self.version += 1
 
 class ListBox(Widget):
     HORIZONTAL = 0
     VERTICAL = 1
+    # a horizontal list moves its selection with left and right, and scrolls with up
+    # and down
+    HORIZONTAL_KEYS = {"right" : "down", "left" : "up", "up" : "left", "down" : "right"}
     
     def __init__(self, axis, model, allow_scroll = False, auto_focus = False):
         assert isinstance(model, ListModel)
@@ -50,6 +61,11 @@ class ListBox(Widget):
         self.allow_scroll = allow_scroll
         self._is_selected_focused = False
         self.remodelling_required = True
+        self.view = None
+        self._scroll_only = False
+        self._rendered_with = None
+        if axis == self.HORIZONTAL:
+            self.remap_keys(self.HORIZONTAL_KEYS)
     
     def _get_is_selected_focused(self):
         return self.auto_focus or self._is_selected_focused
@@ -71,112 +87,188 @@ class ListBox(Widget):
             return self.get_min_size(pwidth, pheight)
     def remodel(self, canvas):
         self.canvas = canvas
+        self._scroll_only = False
         self.remodelling_required = True
+    def get_render_key(self):
+        if self.model.version is None or self.last_index is None:
+            return None
+        keys = []
+        for i in xrange(self.start_index, self.last_index + 1):
+            if not self.model.hasitem(i):
+                break
+            key = self.model.getitem(i).get_render_key()
+            if key is None:
+                return None
+            keys.append(key)
+        return (self.model.version, self.start_index, self.selected_index, 
+            self.scrolled_offset, self.is_selected_focused, tuple(keys))
     def render(self, style, focused = False, highlight = False):
         if self.selected_index < self.start_index or self.selected_index > self.last_index:
             self.last_index = None
             self.start_index = self.selected_index
-
+        
+        # when the only thing that changed is the scrolled offset, the items already 
+        # rendered into the view are still good, and the view only has to be blitted
+        if not self._scroll_only or self.view is None or self._rendered_with != (style, focused):
+            self._render_items(style, focused)
+        self._scroll_only = False
+        if self.axis == self.HORIZONTAL:
+            self.view.scroll_to(0, -self.scrolled_offset)
+            self.scrolled_offset = -self.view.scroll_y
+        else:
+            self.view.scroll_to(-self.scrolled_offset, 0)
+            self.scrolled_offset = -self.view.scroll_x
+        self.view.blit_view()
+    
+    def _render_items(self, style, focused):
         off = 0
         i = self.start_index
-        self.remodelling_required = True
         size = self.canvas.width if self.axis == self.HORIZONTAL else self.canvas.height
-        
+        items = []
         while self.model.hasitem(i) and off < size:
             self.last_index  = i
             item = self.model.getitem(i)
             dw, dh = item.get_desired_size(self.canvas.width, self.canvas.height)
-            if self.remodelling_required:
-                if self.axis == self.HORIZONTAL:
-                    canvas2 = self.canvas.subcanvas(off, self.scrolled_offset, dw, dh)
-                else:
-                    canvas2 = self.canvas.subcanvas(self.scrolled_offset, off, dw, dh)
-                item.remodel(canvas2)
+            items.append((i, item, off, dw, dh))
+            i += 1
+            off += (dw + 1) if self.axis == self.HORIZONTAL else dh
+        
+        # the view is as wide (or as high) as the largest item
+        if self.axis == self.HORIZONTAL:
+            vw = self.canvas.width
+            vh = max([item_dh for _, _, _, _, item_dh in items] + [self.canvas.height])
+        else:
+            vw = max([item_dw for _, _, _, item_dw, _ in items] + [self.canvas.width])
+            vh = self.canvas.height
+        if self.view is None or self.view.width != vw or self.view.height != vh:
+            self.view = self.canvas.scrolled_subcanvas(vw, vh)
+        else:
+            if self.view.parent is not self.canvas:
+                self.view.attach(self.canvas)
+            self.view.clear()
+        
+        for i, item, off, dw, dh in items:
+            if self.axis == self.HORIZONTAL:
+                item.remodel(self.view.subcanvas(off, 0, dw, dh))
+            else:
+                item.remodel(self.view.subcanvas(0, off, dw, dh))
             if i == self.selected_index:
                 item.render(style, focused = focused and self.is_selected_focused, highlight = True)
             else:
                 item.render(style)
-            i += 1
-            off += (dw + 1) if self.axis == self.HORIZONTAL else dh
-        
+        self._rendered_with = (style, focused)
         self.remodelling_required = False
     
     def _on_key(self, evt):
+        self._scroll_only = False
         if self.is_selected_focused:
             item = self.model.getitem(self.selected_index)
             if item.on_event(evt):
                 return True
-        
-        if self.axis == self.HORIZONTAL:
-            if evt == "right":
-                evt = "down"
-            elif evt == "left":
-                evt = "up"
-            elif evt == "up":
-                evt = "left"
-            elif evt == "down":
-                evt = "right"
-        
-        if evt == "esc" and self.is_selected_focused:
+        return self._dispatch_key(evt)
+    
+    def _on_paste(self, evt):
+        if self.is_selected_focused:
+            return self.model.getitem(self.selected_index).on_event(evt)
+        return False
+    
+    @bind("esc")
+    def _key_esc(self, evt):
+        if not self.is_selected_focused:
+            return False
+        self.is_selected_focused = False
+        #self.remodelling_required = True
+        return True
+    
+    @bind("down")
+    def _key_down(self, evt):
+        if self.model.hasitem(self.selected_index + 1):
             self.is_selected_focused = False
-            #self.remodelling_required = True
-            return True
-        elif evt == "down":
-            if self.model.hasitem(self.selected_index + 1):
-                self.is_selected_focused = False
-                self.selected_index += 1
-                self.remodelling_required = True
-            return True
-        elif evt == "up":
-            if self.selected_index >= 1:
-                self.is_selected_focused = False
-                self.selected_index -= 1
-                self.remodelling_required = True
-            return True
-        elif evt == "left" and self.scrolled_offset < 0 and self.allow_scroll:
-            self.scrolled_offset += 1
+            self.selected_index += 1
             self.remodelling_required = True
-            return True
-        elif evt == "right" and self.allow_scroll:
-            self.scrolled_offset -= 1
+        return True
+    
+    @bind("up")
+    def _key_up(self, evt):
+        if self.selected_index >= 1:
+            self.is_selected_focused = False
+            self.selected_index -= 1
             self.remodelling_required = True
-            return True
-        elif evt == "ctrl home" and self.allow_scroll:
-            if self.scrolled_offset != 0:
-                self.scrolled_offset = 0
-                self.remodelling_required = True
-            return True
-        elif evt == "home":
-            if self.selected_index != 0:
-                self.selected_index = 0
-                self.remodelling_required = True
-            return True
-        elif evt == "end":
-            # XXX how do we handle this?
-            return True
-        elif evt == "pagedown":
-            for i in range(0, self.canvas.height):
-                if not self.model.hasitem(self.selected_index):
-                    self.selected_index -= 1
-                    break
-                self.selected_index += 1
-                self.remodelling_required = True
+        return True
+    
+    @bind("left")
+    def _key_left(self, evt):
+        if self.scrolled_offset >= 0 or not self.allow_scroll:
+            return False
+        self.scrolled_offset += 1
+        self._scroll_only = True
+        return True
+    
+    @bind("right")
+    def _key_right(self, evt):
+        if not self.allow_scroll or -self.scrolled_offset >= self._get_max_scroll():
+            return False
+        self.scrolled_offset -= 1
+        self._scroll_only = True
+        return True
+    
+    def _get_max_scroll(self):
+        # how far the view can scroll across the axis (not at all until it's rendered)
+        if self.view is None:
+            return 0
+        if self.axis == self.HORIZONTAL:
+            return self.view.height - self.view.view_height
+        else:
+            return self.view.width - self.view.view_width
+    
+    @bind("ctrl home")
+    def _key_ctrl_home(self, evt):
+        if not self.allow_scroll:
+            return False
+        if self.scrolled_offset != 0:
+            self.scrolled_offset = 0
+            self._scroll_only = True
+        return True
+    
+    @bind("home")
+    def _key_home(self, evt):
+        if self.selected_index != 0:
+            self.selected_index = 0
+            self.remodelling_required = True
+        return True
+    
+    @bind("end")
+    def _key_end(self, evt):
+        # XXX how do we handle this?
+        return True
+    
+    @bind("pagedown")
+    def _key_pagedown(self, evt):
+        for i in range(0, self.canvas.height):
+            if not self.model.hasitem(self.selected_index):
+                self.selected_index -= 1
+                break
+            self.selected_index += 1
+            self.remodelling_required = True
+        self.is_selected_focused = False
+        return True
+    
+    @bind("pageup")
+    def _key_pageup(self, evt):
+        if self.selected_index >= 1:
+            self.selected_index = max(0, self.selected_index - self.canvas.height)
             self.is_selected_focused = False
-            return True
-        elif evt == "pageup":
-            if self.selected_index >= 1:
-                self.selected_index = max(0, self.selected_index - self.canvas.height)
-                self.is_selected_focused = False
-                self.remodelling_required = True
-            return True
-        elif evt == "enter":
-            if self.model.hasitem(self.selected_index):
-                item = self.model.getitem(self.selected_index)
-                if item.is_interactive():
-                    self.is_selected_focused = True
-                    #self.remodelling_required = True
-            return True
-        return False
+            self.remodelling_required = True
+        return True
+    
+    @bind("enter")
+    def _key_enter(self, evt):
+        if self.model.hasitem(self.selected_index):
+            item = self.model.getitem(self.selected_index)
+            if item.is_interactive():
+                self.is_selected_focused = True
+                #self.remodelling_required = True
+        return True
 
 
 def HListBox(model, **kwargs):
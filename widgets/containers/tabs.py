@@ -1,4 +1,4 @@
-from ..base import Widget
+from ..base import Widget, bind
 
 
 class TabInfo(object):
@@ -51,16 +51,18 @@ class TabBox(Widget):
         sw = self.get_selected_widget()
         if sw and sw.on_event(evt):
             return True
-        
-        if evt == "esc" and self.is_selected_focused:
-            self.is_selected_focused = False
-            return True
-        elif evt == "tab":
-            self.is_selected_focused = True
-            return True
-        elif evt == "shift tab":
-            self.is_selected_focused = True
-            return True
-        return False
+        return self._dispatch_key(evt)
+    
+    @bind("esc")
+    def _key_esc(self, evt):
+        if not self.is_selected_focused:
+            return False
+        self.is_selected_focused = False
+        return True
+    
+    @bind("tab", "shift tab")
+    def _key_tab(self, evt):
+        self.is_selected_focused = True
+        return True
 
 
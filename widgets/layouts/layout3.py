@@ -1,4 +1,4 @@
-from ..base import Widget
+from ..base import Widget, bind
 
 HORIZONTAL = 0
 VERTICAL = 1
@@ -248,15 +248,26 @@ class Layout(Widget):
         sw = self.get_selected_widget()
         if sw and sw.on_event(evt):
             return True
-        
-        if evt == "esc" and sw:
-            self.is_selected_focused = False
-            return True
-        elif evt == "tab" and 0 <= self.selected_index < len(self.visible_widgets):
-            return self._select_first_interactive(range(self.selected_index + 1, len(self.visible_widgets)))
-        elif evt == "shift tab" and 0 <= self.selected_index < len(self.visible_widgets):
-            return self._select_first_interactive(range(self.selected_index - 1, 0, -1))
-        return False
+        return self._dispatch_key(evt)
+    
+    @bind("esc")
+    def _key_esc(self, evt):
+        if not self.get_selected_widget():
+            return False
+        self.is_selected_focused = False
+        return True
+    
+    @bind("tab")
+    def _key_tab(self, evt):
+        if not 0 <= self.selected_index < len(self.visible_widgets):
+            return False
+        return self._select_first_interactive(range(self.selected_index + 1, len(self.visible_widgets)))
+    
+    @bind("shift tab")
+    def _key_shift_tab(self, evt):
+        if not 0 <= self.selected_index < len(self.visible_widgets):
+            return False
+        return self._select_first_interactive(range(self.selected_index - 1, 0, -1))
 
     def _on_mouse(self, evt):
         for wgt, (x, y, w, h) in self.visible_widgets:
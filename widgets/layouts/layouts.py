@@ -1,4 +1,4 @@
-from ..base import Widget
+from ..base import Widget, bind
 import itertools
 
 
@@ -102,7 +102,7 @@ class Layout(Widget):
         
         if self.visible_widgets:
             self.selected_index = -1
-            self._on_key("tab")
+            self._key_tab(None)
         else:
             self.selected_index = None
     
@@ -114,35 +114,42 @@ class Layout(Widget):
         sw = self.get_selected_widget()
         if sw and sw.on_event(evt):
             return True
-        
-        if evt == "tab":
-            orig = self.selected_index
-            while self.selected_index <= len(self.visible_widgets) - 2:
-                self.selected_index += 1
-                widget = self.get_selected_widget()
-                if not widget:
-                    break
-                if widget.is_interactive():
-                    self.is_selected_focused = True
-                    return True
-            self.selected_index = orig
-            return False
-        elif evt == "shift tab":
-            orig = self.selected_index
-            while self.selected_index >= 1:
-                self.selected_index -= 1
-                widget = self.get_selected_widget()
-                if not widget:
-                    break
-                if widget.is_interactive():
-                    self.is_selected_focused = True
-                    return True
-            self.selected_index = orig
-            return False
-        elif evt == "esc" and self.is_selected_focused:
-            self.is_selected_focused = False
-            return True
+        return self._dispatch_key(evt)
+    
+    @bind("tab")
+    def _key_tab(self, evt):
+        orig = self.selected_index
+        while self.selected_index <= len(self.visible_widgets) - 2:
+            self.selected_index += 1
+            widget = self.get_selected_widget()
+            if not widget:
+                break
+            if widget.is_interactive():
+                self.is_selected_focused = True
+                return True
+        self.selected_index = orig
+        return False
+    
+    @bind("shift tab")
+    def _key_shift_tab(self, evt):
+        orig = self.selected_index
+        while self.selected_index >= 1:
+            self.selected_index -= 1
+            widget = self.get_selected_widget()
+            if not widget:
+                break
+            if widget.is_interactive():
+                self.is_selected_focused = True
+                return True
+        self.selected_index = orig
         return False
+    
+    @bind("esc")
+    def _key_esc(self, evt):
+        if not self.is_selected_focused:
+            return False
+        self.is_selected_focused = False
+        return True
 
 def _layout(widgets, axis):
     widgets2 = [wgt if isinstance(wgt, LayoutInfo) else LayoutInfo(wgt) 
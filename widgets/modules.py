@@ -1,9 +1,8 @@
 import itertools
 import inspect
-from ..events import KeyEvent
 from .base import Widget
 from .basic import Button, LabelBox
-from .containers import StubBox, Frame
+from .containers import StubBox, Frame, Cached
 from .containers import SimpleListModel, HListBox, VListBox
 from .layouts import VLayout, HLayout
 
@@ -17,6 +16,11 @@ class ActionInfo(object):
         self.keys = keys
         self.func = func
         self.order = self._counter.next()
+        # actions take part in the class' keymap, like methods decorated with bind
+        self._bound_keys = tuple(keys)
+    
+    def __call__(self, module, evt):
+        return self.func(module, evt)
 
 def action(title = None, doc = None, keys = ()):
     def deco(func):
@@ -33,10 +37,6 @@ class Module(Widget):
     def __init__(self, root):
         self.root = root
         self._actions = self._get_actions()
-        self._key_bindings = {}
-        for action in self._actions:
-            for key in action.keys:
-                self._key_bindings[KeyEvent.from_string(key)] = action
     
     def _get_actions(self):
         actions = []
@@ -60,10 +60,7 @@ class Module(Widget):
     def on_event(self, evt):
         if self.root.on_event(evt):
             return True
-        if evt in self._key_bindings:
-            action = self._key_bindings[evt]
-            return action.func(self, evt)
-        return False
+        return self._dispatch_key(evt)
 
 class FramedModule(Module):
     def __init__(self, body, header = None):
@@ -77,7 +74,7 @@ class FramedModule(Module):
                 self.body,
                 self.header,
                 self.banner,
-                self.footer
+                Cached(self.footer)
             )
         )
         self._populate_footer(footer_actions)
@@ -114,7 +111,7 @@ class FramedModule(Module):
     @action(title = "Help", keys = ["?"])
     def action_help(self, evt):
         """Display this help message, describing the different commands and key bindings"""
-        self._set_banner(Frame(LabelBox(self._get_help_message()), "Help"))
+        self._set_banner(Cached(Frame(LabelBox(self._get_help_message()), "Help")))
         return True
     
     @action(keys = ["esc"])
@@ -133,7 +130,7 @@ class ListModule(FramedModule):
                 title = title[:-6]
         self.model = SimpleListModel(items)
         self.vlist = VListBox(self.model)
-        FramedModule.__init__(self, Frame(self.vlist, title = title))
+        FramedModule.__init__(self, Cached(Frame(self.vlist, title = title)))
     
     def append(self, item):
         self.model.append(item)